@@ -0,0 +1,143 @@
+"""
+Computerized adaptive practice: each next question is the one that tells us
+most about the taker's ability, within the exam blueprint.
+
+Everything expensive is done once, when the engine is built:
+  - the item information of every question at every point of an ability
+    grid (from the IRT parameters in question_pool/irt_params.json;
+    uncalibrated questions get a=1, b=0)
+  - log P(right) and log P(wrong) tables over the same grid, so the ability
+    estimate (EAP, standard normal prior) is a sum of a few table columns
+  - per category and grid point, the question indices sorted by information
+
+Picking a question is then: estimate ability from the answers so far, snap
+it to the grid, and walk each allowed category's sorted list past the
+questions already asked. A step takes microseconds even for a 100k pool.
+
+The blueprint is honoured by only allowing categories still under their
+maximum, and only the ones below their minimum once the remaining slots are
+needed to reach them.
+"""
+import math
+
+import numpy as np
+
+import exam_logic
+import irt
+
+THETA_GRID = np.linspace(-4, 4, 81)
+# Exposure-control rejections before a step gives up and takes the best question
+MAX_REJECTIONS = 20
+
+class AdaptiveEngine:
+    def __init__(self, questions, params=None, grid=THETA_GRID, seed=0):
+        self.questions = questions
+        self.grid = grid
+        self.ids = [q["id"] for q in questions]
+        self.index_of = {qid: j for j, qid in enumerate(self.ids)}
+        self.categories = list(exam_logic.CATEGORY_RANGES)
+        self.category_of = [self.categories.index(q["category"]) if q["category"] in self.categories else -1 for q in questions]
+
+        items = (params or {}).get("items", {})
+        a = np.array([items.get(str(qid), {}).get("a", 1.0) for qid in self.ids])
+        b = np.array([items.get(str(qid), {}).get("b", 0.0) for qid in self.ids])
+        c = np.array([items.get(str(qid), {}).get("c", 0.0) for qid in self.ids])
+        self.calibrated = sum(str(qid) in items for qid in self.ids)
+
+        p = np.clip(irt.probability(grid, a, b, c), 1e-9, 1 - 1e-9)   # grid x items
+        # float32 halves the tables, which matters for 100k-question pools
+        self.log_p = np.log(p).astype(np.float32)
+        self.log_q = np.log1p(-p).astype(np.float32)
+        self.log_prior = -grid ** 2 / 2
+        # 3PL item information; reduces to a^2 P Q when c = 0
+        info = a ** 2 * ((p - c) / (1 - c)) ** 2 * (1 - p) / p
+        self.info = info.astype(np.float32)
+
+        # Ties (e.g. no calibration yet) are broken by a fixed random order, not pool order
+        jitter = np.random.default_rng(seed).random(len(questions)) * 1e-9
+        category_of = np.array(self.category_of)
+        self.order = []
+        for cat in range(len(self.categories)):
+            members = np.flatnonzero(category_of == cat)
+            ranked = np.argsort(-(info[:, members] + jitter[members]), axis=1, kind="stable")
+            self.order.append(members[ranked].astype(np.int32))   # grid x members
+
+    def estimate(self, answered):
+        """EAP ability and its posterior sd from [(question_id, correct), ...]."""
+        known = [(self.index_of[qid], bool(correct)) for qid, correct in answered if qid in self.index_of]
+        log_post = self.log_prior
+        if known:
+            cols, right = zip(*known)
+            cols = list(cols)
+            log_post = log_post + np.where(right, self.log_p[:, cols], self.log_q[:, cols]).sum(axis=1)
+        post = np.exp(log_post - log_post.max())
+        post /= post.sum()
+        theta = float(post @ self.grid)
+        return theta, math.sqrt(max(float(post @ self.grid ** 2) - theta * theta, 0.0))
+
+    def _grid_point(self, theta):
+        step = self.grid[1] - self.grid[0]
+        return min(max(int(round((theta - self.grid[0]) / step)), 0), len(self.grid) - 1)
+
+    def allowed_categories(self, counts, asked):
+        """Category indices the next question may come from under the blueprint."""
+        ranges = list(exam_logic.CATEGORY_RANGES.values())
+        remaining = exam_logic.EXAM_LENGTH - asked
+        short = [max(0, low - n) for (low, _), n in zip(ranges, counts)]
+        if sum(short) >= remaining:
+            return [c for c, s in enumerate(short) if s > 0]
+        return [c for c, ((_, high), n) in enumerate(zip(ranges, counts)) if n < high]
+
+    def next_question(self, answered, admit=None, skipped=None):
+        """
+        ID of the most informative question allowed next, or None once the
+        exam is complete. `answered` is [(question_id, correct), ...] in order.
+
+        With `admit` (exposure control), a question that loses its lottery is
+        added to `skipped`, a set of IDs the caller keeps for the whole exam,
+        and isn't offered again in it (as in Sympson-Hetter).
+        """
+        if len(answered) >= exam_logic.EXAM_LENGTH:
+            return None
+        g = self._grid_point(self.estimate(answered)[0])
+
+        used = {self.index_of[qid] for qid, _ in answered if qid in self.index_of}
+        counts = [0] * len(self.categories)
+        for j in used:
+            if self.category_of[j] >= 0:
+                counts[self.category_of[j]] += 1
+        allowed = self.allowed_categories(counts, len(answered))
+
+        # Turned-down questions are out of the running, but don't count toward the blueprint
+        skipped = set() if skipped is None else skipped
+        used.update(self.index_of[qid] for qid in skipped if qid in self.index_of)
+        first = None
+        for _ in range(MAX_REJECTIONS + 1):
+            best, best_info = None, -1.0
+            for cat in allowed:
+                for j in self.order[cat][g]:
+                    if j not in used:
+                        # Best left in this category; the most informative of those wins
+                        if self.info[g, j] > best_info:
+                            best, best_info = j, self.info[g, j]
+                        break
+            if best is None:
+                break
+            first = best if first is None else first
+            if admit is None or admit(self.ids[best]):
+                return self.ids[best]
+            used.add(best)
+            skipped.add(self.ids[best])
+        # Everything tried was turned down: use the best one anyway
+        return None if first is None else self.ids[first]
+
+    def category_accuracy(self, theta):
+        """Expected share right per category at ability theta (for estimate_pass_probability)."""
+        p = np.exp(self.log_p[self._grid_point(theta)])
+        category_of = np.array(self.category_of)
+        return {name: float(p[category_of == cat].mean()) for cat, name in enumerate(self.categories)
+                if (category_of == cat).any()}
+
+def load_engine(questions, params_path=irt.PARAMS_PATH):
+    """Engine over `questions` using the saved IRT calibration, if any."""
+    return AdaptiveEngine(questions, irt.load_params(params_path))
@@ -0,0 +1,30 @@
+"""
+Access control for operator-only features (profiling, memory snapshots).
+
+Requests prove they come from an operator by sending the ADMIN_TOKEN
+environment variable in the X-Admin-Token header. With no ADMIN_TOKEN set,
+admin features are off entirely.
+"""
+import functools
+import hmac
+import os
+
+from flask import abort, request
+
+HEADER = "X-Admin-Token"
+ENVIRON_KEY = "HTTP_X_ADMIN_TOKEN"
+
+def is_admin_token(token):
+    expected = os.environ.get("ADMIN_TOKEN")
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+def admin_required(view):
+    """Route decorator: 404 unless the request carries a valid admin token."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_admin_token(request.headers.get(HEADER)):
+            abort(404)
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,268 @@
+"""
+Columnar snapshots of the answer log, for fast aggregate queries.
+
+`compact` reads the sealed answer log files (see answer_log.sealed_files),
+splits their events by UTC date and writes one part per date:
+
+    ANALYTICS_DIR/manifest.json   compacted log files and the parts they made
+    ANALYTICS_DIR/<YYYY-MM-DD>/part-<n>/
+        sources.json              log files with events in this part
+        q_id.npy                  per question (sorted IDs) for that day:
+        q_attempts.npy              answers
+        q_correct.npy               right answers
+        q_latency_ms.npy            summed latency
+        q_options.npy               answers per option index (questions x options)
+        ev_ts.npy ev_exam.npy     every answer event, one column per field
+        ev_q.npy ev_opt.npy       (exam tokens as uint64)
+        ev_ok.npy ev_ms.npy
+        fin_exam.npy fin_score.npy fin_total.npy fin_passed.npy
+                                  every exam-finished event
+
+Parts are only ever added, and a log file is compacted once. A run writes
+all its parts, then the manifest (renamed into place), and only that counts
+as done: a run that dies halfway leaves parts that aren't in the manifest,
+which queries ignore and the next run deletes before redoing those logs.
+Queries memory-map the columns, so per-question or per-category accuracy
+over a date range only reads the small per-day aggregates.
+
+Usage:
+    uv run analytics.py compact [--delete-logs]
+    uv run analytics.py query --start 2026-10-01 --end 2026-10-31 [--by category]
+"""
+import argparse
+import datetime
+import glob
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+import answer_log
+import exam_logic
+
+ANALYTICS_DIR = os.environ.get("ANALYTICS_DIR", "analytics")
+MANIFEST = "manifest.json"
+
+EVENT_COLUMNS = {"ts": np.int64, "exam": np.uint64, "q": np.int32, "opt": np.int8, "ok": np.int8, "ms": np.int32}
+FINISH_COLUMNS = {"exam": np.uint64, "score": np.int16, "total": np.int16, "passed": np.int8}
+
+def _exam_key(token):
+    # Exam tokens are 16 hex characters, i.e. exactly 64 bits
+    return int(token, 16) if token else 0
+
+# --- Compaction ---
+
+def _load_manifest(directory):
+    """{"sources": [...], "parts": [...]} of every finished run (part paths relative to `directory`)."""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return {"sources": [], "parts": []}
+    with open(path) as f:
+        return json.load(f)
+
+def _save_manifest(directory, manifest):
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f".tmp-{MANIFEST}-{os.getpid()}")
+    with open(tmp, "w") as f:
+        json.dump({"sources": sorted(set(manifest["sources"])), "parts": sorted(manifest["parts"])}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, MANIFEST))
+
+def compacted_sources(directory=ANALYTICS_DIR):
+    return set(_load_manifest(directory)["sources"])
+
+def _remove_unfinished(directory, manifest):
+    """Deletes parts left behind by a run that didn't get to write the manifest."""
+    committed = set(manifest["parts"])
+    for part in glob.glob(os.path.join(directory, "*", "part-*")) + glob.glob(os.path.join(directory, "*", ".tmp-part-*")):
+        if os.path.relpath(part, directory) not in committed:
+            shutil.rmtree(part, ignore_errors=True)
+
+def _write_part(directory, date, sources, answers, finishes):
+    """
+    `answers` and `finishes` are {column: list of values}, `sources` the
+    log files they came from. Returns the part's path relative to `directory`.
+    """
+    date_dir = os.path.join(directory, date)
+    os.makedirs(date_dir, exist_ok=True)
+    n = len(glob.glob(os.path.join(date_dir, "part-*"))) + 1
+    # Written under a temporary name and renamed, so readers never see half a part
+    tmp = os.path.join(date_dir, f".tmp-part-{n:05d}-{os.getpid()}")
+    os.makedirs(tmp)
+
+    ev = {name: np.array(answers[name], dtype=dtype) for name, dtype in EVENT_COLUMNS.items()}
+    fin = {name: np.array(finishes[name], dtype=dtype) for name, dtype in FINISH_COLUMNS.items()}
+
+    q_id, slot = np.unique(ev["q"], return_inverse=True)
+    n_options = int(ev["opt"].max()) + 1 if len(ev["opt"]) else 0
+    options = np.zeros((len(q_id), max(1, n_options)), dtype=np.int64)
+    chosen = ev["opt"] >= 0
+    np.add.at(options, (slot[chosen], ev["opt"][chosen]), 1)
+    columns = {
+        "q_id": q_id,
+        "q_attempts": np.bincount(slot, minlength=len(q_id)),
+        "q_correct": np.bincount(slot, weights=ev["ok"], minlength=len(q_id)).astype(np.int64),
+        "q_latency_ms": np.bincount(slot, weights=ev["ms"], minlength=len(q_id)).astype(np.int64),
+        "q_options": options,
+    }
+    columns.update({f"ev_{name}": values for name, values in ev.items()})
+    columns.update({f"fin_{name}": values for name, values in fin.items()})
+
+    for name, values in columns.items():
+        np.save(os.path.join(tmp, name + ".npy"), values)
+    with open(os.path.join(tmp, "sources.json"), "w") as f:
+        json.dump({"sources": sorted(sources)}, f)
+    os.rename(tmp, os.path.join(date_dir, f"part-{n:05d}"))
+    return os.path.join(date, f"part-{n:05d}")
+
+def compact(log_dir=None, directory=ANALYTICS_DIR, delete_logs=False):
+    """Compacts every sealed, not yet compacted log file. Returns the files compacted."""
+    manifest = _load_manifest(directory)
+    done = set(manifest["sources"])
+    todo = [p for p in answer_log.sealed_files(log_dir) if os.path.basename(p) not in done]
+    if not todo:
+        return []
+    _remove_unfinished(directory, manifest)
+
+    by_date = {}
+    dates = {}
+    for path in todo:
+        source = os.path.basename(path)
+        for event in answer_log.read_events(paths=[path]):
+            day = event["ts"] // 86_400_000
+            date = dates.get(day)
+            if date is None:
+                date = dates[day] = datetime.datetime.fromtimestamp(day * 86_400, datetime.timezone.utc).strftime("%Y-%m-%d")
+            if date not in by_date:
+                by_date[date] = ({name: [] for name in EVENT_COLUMNS}, {name: [] for name in FINISH_COLUMNS}, set())
+            answers, finishes, sources = by_date[date]
+            sources.add(source)
+            columns = answers if event["type"] == "answer" else finishes
+            for name, values in columns.items():
+                values.append(_exam_key(event[name]) if name == "exam" else event[name])
+
+    parts = [
+        _write_part(directory, date, sources, answers, finishes)
+        for date, (answers, finishes, sources) in sorted(by_date.items())
+    ]
+    # The commit point: until the manifest lists them, these logs aren't done and these parts don't exist
+    manifest["sources"].extend(os.path.basename(p) for p in todo)
+    manifest["parts"].extend(parts)
+    _save_manifest(directory, manifest)
+
+    if delete_logs:
+        for path in todo:
+            os.remove(path)
+    return todo
+
+# --- Queries ---
+
+def _parts(start=None, end=None, directory=ANALYTICS_DIR):
+    """Part directories with start <= date <= end (inclusive, 'YYYY-MM-DD')."""
+    parts = []
+    for part in _load_manifest(directory)["parts"]:
+        date = os.path.dirname(part)
+        if (start is None or date >= start) and (end is None or date <= end):
+            parts.append(os.path.join(directory, part))
+    return parts
+
+def _column(part, name):
+    return np.load(os.path.join(part, name + ".npy"), mmap_mode="r")
+
+def question_stats(start=None, end=None, directory=ANALYTICS_DIR):
+    """
+    Per-question totals over a date range, as arrays sorted by question ID:
+    question_id, attempts, correct, accuracy, mean_latency_ms, options.
+    """
+    parts = _parts(start, end, directory)
+    ids = np.unique(np.concatenate([_column(p, "q_id") for p in parts])) if parts else np.array([], dtype=np.int32)
+    width = max([_column(p, "q_options").shape[1] for p in parts], default=1)
+    attempts = np.zeros(len(ids), dtype=np.int64)
+    correct = np.zeros(len(ids), dtype=np.int64)
+    latency = np.zeros(len(ids), dtype=np.int64)
+    options = np.zeros((len(ids), width), dtype=np.int64)
+    for part in parts:
+        slot = np.searchsorted(ids, _column(part, "q_id"))
+        attempts[slot] += _column(part, "q_attempts")
+        correct[slot] += _column(part, "q_correct")
+        latency[slot] += _column(part, "q_latency_ms")
+        part_options = _column(part, "q_options")
+        options[slot, :part_options.shape[1]] += part_options
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "question_id": ids,
+            "attempts": attempts,
+            "correct": correct,
+            "accuracy": correct / attempts,
+            "mean_latency_ms": latency / attempts,
+            "options": options,
+        }
+
+def category_stats(start=None, end=None, directory=ANALYTICS_DIR, questions=None):
+    """{category: {"attempts", "correct", "accuracy"}} over a date range."""
+    stats = question_stats(start, end, directory)
+    category_of = {q["id"]: q["category"] for q in (questions or exam_logic.load_questions())}
+    result = {}
+    for qid, attempts, correct in zip(stats["question_id"].tolist(), stats["attempts"].tolist(), stats["correct"].tolist()):
+        entry = result.setdefault(category_of.get(qid, "Unknown"), {"attempts": 0, "correct": 0})
+        entry["attempts"] += attempts
+        entry["correct"] += correct
+    for entry in result.values():
+        entry["accuracy"] = entry["correct"] / entry["attempts"]
+    return result
+
+def load_events(start=None, end=None, directory=ANALYTICS_DIR):
+    """
+    Every answer and exam-finished event in a date range, as column arrays:
+    ({ts, exam, q, opt, ok, ms}, {exam, score, total, passed}).
+    """
+    parts = _parts(start, end, directory)
+    answers = {
+        name: np.concatenate([_column(p, f"ev_{name}") for p in parts]) if parts else np.array([], dtype=dtype)
+        for name, dtype in EVENT_COLUMNS.items()
+    }
+    finishes = {
+        name: np.concatenate([_column(p, f"fin_{name}") for p in parts]) if parts else np.array([], dtype=dtype)
+        for name, dtype in FINISH_COLUMNS.items()
+    }
+    return answers, finishes
+
+def clear(directory=ANALYTICS_DIR):
+    """Deletes every snapshot (the logs are untouched, so compact can rebuild them)."""
+    shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the answer log and query the snapshots.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    compact_parser = sub.add_parser("compact", help="Turn sealed answer logs into columnar snapshots")
+    compact_parser.add_argument("--log-dir", default=answer_log.LOG_DIR, help="Answer log directory")
+    compact_parser.add_argument("--delete-logs", action="store_true", help="Delete log files once compacted")
+    query_parser = sub.add_parser("query", help="Accuracy over a date range")
+    query_parser.add_argument("--start", help="First date (YYYY-MM-DD, inclusive)")
+    query_parser.add_argument("--end", help="Last date (YYYY-MM-DD, inclusive)")
+    query_parser.add_argument("--by", choices=["question", "category"], default="category")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.command == "compact":
+        files = compact(args.log_dir, delete_logs=args.delete_logs)
+        print(f"Compacted {len(files)} log file(s) in {time.perf_counter() - started:.2f}s")
+    elif args.by == "category":
+        stats = category_stats(args.start, args.end)
+        elapsed = time.perf_counter() - started
+        for category, entry in sorted(stats.items()):
+            print(f"{category:<28} {entry['accuracy']:>7.1%} of {entry['attempts']}")
+        print(f"({elapsed * 1000:.1f} ms)")
+    else:
+        stats = question_stats(args.start, args.end)
+        elapsed = time.perf_counter() - started
+        print(f"{'question':>8} {'attempts':>9} {'accuracy':>9} {'latency':>9}")
+        for qid, attempts, accuracy, latency in zip(
+            stats["question_id"], stats["attempts"], stats["accuracy"], stats["mean_latency_ms"]
+        ):
+            print(f"{qid:>8} {attempts:>9} {accuracy:>9.1%} {latency / 1000:>8.1f}s")
+        print(f"({elapsed * 1000:.1f} ms)")
@@ -0,0 +1,249 @@
+"""
+Append-only log of answer events, for learning from production traffic.
+
+Request handlers only put an event on an in-memory queue. A writer thread per
+process batches whatever arrived in the last ANSWER_LOG_COMMIT_MS, writes the
+batch in one call and fsyncs once (group commit). Each process writes its own
+files, so gunicorn workers never contend:
+
+    ANSWER_LOG_DIR/answers-<start time>-<pid>-<seq>.jsonl
+
+and starts a new file once the current one passes ANSWER_LOG_MAX_MB.
+
+One compact JSON object per line:
+
+    {"ts":1760832000123,"type":"answer","exam":"9a1b...","q":17,"opt":2,"ok":1,"ms":5310}
+    {"ts":1760832100456,"type":"finish","exam":"9a1b...","score":25,"total":30,"passed":1}
+
+`opt` is the index of the chosen option, `ms` the time since the question
+was shown. Only standard exams are logged (custom exam IDs aren't pool IDs).
+Set ANSWER_LOG_DIR to an empty string to turn logging off.
+
+Replay rebuilds aggregates from the files:
+    uv run answer_log.py --out answer_stats.json
+"""
+import argparse
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import memory
+
+log = logging.getLogger(__name__)
+
+LOG_DIR = os.environ.get("ANSWER_LOG_DIR", "answer_log")
+COMMIT_INTERVAL = float(os.environ.get("ANSWER_LOG_COMMIT_MS", "200")) / 1000
+MAX_BYTES = int(float(os.environ.get("ANSWER_LOG_MAX_MB", "64")) * 1024 * 1024)
+MAX_PENDING = int(os.environ.get("ANSWER_LOG_QUEUE", "10000"))
+# Most events a single commit takes off the queue
+MAX_BATCH = 1000
+
+_queue = queue.Queue(maxsize=MAX_PENDING)
+_writer = None
+_writer_pid = None
+_lock = threading.Lock()
+_file = {"handle": None, "seq": 0, "started": None}
+_dropped = 0
+
+def enabled():
+    return bool(LOG_DIR)
+
+def _ensure_writer():
+    """Starts the writer thread (again after a fork, threads don't survive it)."""
+    global _writer, _writer_pid, _queue
+    if _writer_pid == os.getpid() and _writer.is_alive():
+        return
+    with _lock:
+        if _writer_pid == os.getpid() and _writer.is_alive():
+            return
+        if _writer_pid is not None and _writer_pid != os.getpid():
+            # Forked: the parent's queue and open file belong to the parent
+            _queue = queue.Queue(maxsize=MAX_PENDING)
+            _file.update(handle=None, seq=0, started=None)
+        else:
+            atexit.register(_stop)
+        _writer = threading.Thread(target=_run, name="answer-log-writer", daemon=True)
+        _writer_pid = os.getpid()
+        _writer.start()
+
+def _run():
+    while True:
+        batch = [_queue.get()]
+        deadline = time.monotonic() + COMMIT_INTERVAL
+        while len(batch) < MAX_BATCH and batch[-1] is not None:
+            try:
+                batch.append(_queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        stopping = batch[-1] is None
+        if stopping:
+            batch.pop()
+        if batch:
+            try:
+                _commit(batch)
+            except OSError as e:
+                log.warning("Failed to write %d answer events: %s", len(batch), e)
+        if stopping:
+            return
+
+def _open_next():
+    if _file["started"] is None:
+        _file["started"] = time.strftime("%Y%m%d-%H%M%S")
+    _file["seq"] += 1
+    os.makedirs(LOG_DIR, exist_ok=True)
+    path = os.path.join(LOG_DIR, f"answers-{_file['started']}-{os.getpid()}-{_file['seq']:04d}.jsonl")
+    _file["handle"] = open(path, "ab")
+
+def _commit(events):
+    data = "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in events).encode()
+    if _file["handle"] is None:
+        _open_next()
+    f = _file["handle"]
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+    if f.tell() >= MAX_BYTES:
+        f.close()
+        _file["handle"] = None
+
+def _emit(event):
+    global _dropped
+    if not enabled():
+        return False
+    _ensure_writer()
+    try:
+        _queue.put_nowait(event)
+    except queue.Full:
+        _dropped += 1
+        return False
+    return True
+
+def record_answer(exam, question_id, option, correct, latency_ms):
+    """Queues an answer event. Never blocks; returns False if the event was dropped."""
+    return _emit({
+        "ts": int(time.time() * 1000), "type": "answer", "exam": exam,
+        "q": question_id, "opt": option, "ok": int(correct), "ms": latency_ms,
+    })
+
+def record_finish(exam, score, total, passed):
+    return _emit({
+        "ts": int(time.time() * 1000), "type": "finish", "exam": exam,
+        "score": score, "total": total, "passed": int(passed),
+    })
+
+def _stop():
+    # Let the writer commit what's queued (and the batch it holds) before exit
+    if _writer_pid == os.getpid() and _writer.is_alive():
+        _queue.put(None)
+        _writer.join(timeout=5)
+
+def pending():
+    """Events waiting to be written."""
+    return _queue.qsize()
+
+def dropped():
+    """Events thrown away because the queue was full."""
+    return _dropped
+
+# --- Replay ---
+
+def log_files(directory=None):
+    """All log files, oldest first."""
+    return sorted(glob.glob(os.path.join(directory or LOG_DIR, "answers-*.jsonl")))
+
+def _writer_alive(date, clock, pid):
+    # The pid alone isn't enough: after a container restart another process may have it.
+    # The writer's process started before its first file was named (to the second).
+    started = memory.process_started(pid)
+    if started is None:
+        return False
+    return started <= time.mktime(time.strptime(date + clock, "%Y%m%d%H%M%S")) + 1
+
+def sealed_files(directory=None):
+    """
+    Log files nothing will append to any more: rotated ones, and the last
+    file of a process that has exited. Assumes the writers run on this host.
+    """
+    latest = {}
+    for path in log_files(directory):
+        # answers-<date>-<time>-<pid>-<seq>.jsonl
+        _, date, clock, pid, seq = os.path.basename(path)[:-len(".jsonl")].split("-")
+        writer = (date, clock, int(pid))
+        latest[writer] = max(latest.get(writer, 0), int(seq))
+
+    alive = {writer: _writer_alive(*writer) for writer in latest}
+    sealed = []
+    for path in log_files(directory):
+        _, date, clock, pid, seq = os.path.basename(path)[:-len(".jsonl")].split("-")
+        writer = (date, clock, int(pid))
+        if int(seq) < latest[writer] or not alive[writer]:
+            sealed.append(path)
+    return sealed
+
+def read_events(directory=None, paths=None):
+    """Yields every event in the log (or in `paths`). A torn last line (crash mid-write) is skipped."""
+    for path in paths if paths is not None else log_files(directory):
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    log.warning("Skipping unreadable line in %s", path)
+
+def aggregate(events):
+    """Per-question and per-exam totals rebuilt from events."""
+    questions = {}
+    exams = {"finished": 0, "passed": 0, "score_sum": 0}
+    answers = 0
+    for e in events:
+        if e["type"] == "answer":
+            answers += 1
+            q = questions.setdefault(e["q"], {"attempts": 0, "correct": 0, "latency_ms_sum": 0, "options": {}})
+            q["attempts"] += 1
+            q["correct"] += e["ok"]
+            q["latency_ms_sum"] += e["ms"]
+            q["options"][e["opt"]] = q["options"].get(e["opt"], 0) + 1
+        elif e["type"] == "finish":
+            exams["finished"] += 1
+            exams["passed"] += e["passed"]
+            exams["score_sum"] += e["score"]
+
+    for q in questions.values():
+        q["p_correct"] = q["correct"] / q["attempts"]
+        q["mean_latency_ms"] = q.pop("latency_ms_sum") / q["attempts"]
+    if exams["finished"]:
+        exams["pass_rate"] = exams["passed"] / exams["finished"]
+        exams["mean_score"] = exams["score_sum"] / exams["finished"]
+    del exams["score_sum"]
+    return {"answers": answers, "exams": exams, "questions": dict(sorted(questions.items()))}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild answer statistics from the answer log.")
+    parser.add_argument("--dir", default=LOG_DIR, help="Log directory (default ANSWER_LOG_DIR or answer_log)")
+    parser.add_argument("--out", help="Write the aggregates as JSON to this file")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = aggregate(read_events(args.dir))
+    elapsed = time.perf_counter() - started
+    print(f"Replayed {stats['answers']} answers from {len(log_files(args.dir))} file(s) in {elapsed:.2f}s")
+    exams = stats["exams"]
+    if exams["finished"]:
+        print(f"Exams finished: {exams['finished']}, pass rate {exams['pass_rate']:.1%}, "
+              f"mean score {exams['mean_score']:.1f}")
+
+    hardest = sorted(stats["questions"].items(), key=lambda item: item[1]["p_correct"])[:10]
+    if hardest:
+        print("Hardest questions:")
+        for qid, q in hardest:
+            print(f"  #{qid}: {q['p_correct']:.0%} correct of {q['attempts']}, {q['mean_latency_ms'] / 1000:.1f}s on average")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(stats, f, indent=2)
+        print(f"Aggregates written to {args.out}")
@@ -1,9 +1,16 @@
 import customtkinter as ctk
 import exam_logic
+import study
+import weak_areas
 from tkinter import messagebox
 from PIL import Image
 import os
 
+# Study deck, kept between runs
+DECK_PATH = os.environ.get("STUDY_DECK_PATH", os.path.join(os.path.expanduser("~"), ".alabama_dl_study"))
+# Per-question answer history, for weak-area exams
+HISTORY_PATH = os.environ.get("ANSWER_HISTORY_PATH", os.path.join(os.path.expanduser("~"), ".alabama_dl_history"))
+
 # Set theme
 ctk.set_appearance_mode("System")  # Modes: "System" (standard), "Dark", "Light"
 ctk.set_default_color_theme("blue")  # Themes: "blue" (standard), "green", "dark-blue"
@@ -23,13 +30,21 @@ class App(ctk.CTk):
         self.current_question_index = 0
         self.score = 0
         self.user_answers = {} # Map question ID to selected option
+        self.question_map = {q["id"]: q for q in self.all_questions}
+        self.engine = None # Adaptive engine, built on first use
+        self.adaptive = False
+        self.answered = [] # (question ID, correct) in order, for the adaptive engine
+        self.deck = study.load_file(DECK_PATH)
+        self.studying = False
+        self.history = weak_areas.load_file(HISTORY_PATH)
+        self.weak_sampler = weak_areas.WeakAreaSampler(self.all_questions)
 
         # Grid layout
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
 
         # Initialize Frames
-        self.start_frame = StartFrame(self, self.start_exam)
+        self.start_frame = StartFrame(self, self.start_exam, self.start_adaptive, self.start_study, self.start_weak)
         self.quiz_frame = QuizFrame(self, self.submit_answer, self.next_question)
         self.results_frame = ResultsFrame(self, self.restart_exam)
 
@@ -49,10 +64,15 @@ class App(ctk.CTk):
         elif frame_name == "results":
             self.results_frame.grid(row=0, column=0, sticky="nsew")
 
-    def start_exam(self):
+    def start_exam(self, weak=False):
         """Generates a new exam and switches to the quiz screen."""
         try:
-            self.current_exam = exam_logic.generate_exam(self.all_questions)
+            if weak:
+                self.current_exam = self.weak_sampler.generate_exam(self.history)
+            else:
+                self.current_exam = exam_logic.generate_exam(self.all_questions)
+            self.adaptive = False
+            self.studying = False
             self.current_question_index = 0
             self.score = 0
             self.user_answers = {}
@@ -62,20 +82,87 @@ class App(ctk.CTk):
         except Exception as e:
             messagebox.showerror("Error", f"Failed to start exam: {e}")
 
+    def start_weak(self):
+        """An exam weighted toward the questions and categories missed before."""
+        self.start_exam(weak=True)
+
+    def start_adaptive(self):
+        """Starts adaptive practice: each question is picked from the answers so far."""
+        try:
+            if self.engine is None:
+                import adaptive # needs NumPy, so only loaded when asked for
+                self.engine = adaptive.load_engine(self.all_questions)
+            self.adaptive = True
+            self.studying = False
+            self.answered = []
+            self.current_exam = [self.question_map[self.engine.next_question([])]]
+            self.current_question_index = 0
+            self.score = 0
+            self.user_answers = {}
+            self.incorrect_answers = []
+            self.load_question()
+            self.show_frame("quiz")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to start adaptive practice: {e}")
+
+    def start_study(self):
+        """Reviews the missed questions that are due, one card at a time."""
+        qid = self.next_card()
+        if qid is None:
+            messagebox.showinfo("Study", "No cards are due. Questions you miss in an exam are added to the deck." if not len(self.deck) else "All caught up! No cards are due right now.")
+            return
+        self.studying = True
+        self.adaptive = False
+        self.current_exam = [self.question_map[qid]]
+        self.current_question_index = 0
+        self.load_question()
+        self.show_frame("quiz")
+
+    def next_card(self):
+        qid = self.deck.next_card()
+        # Skip cards for questions no longer in the pool
+        while qid is not None and qid not in self.question_map:
+            del self.deck.cards[qid]
+            qid = self.deck.next_card()
+        return qid
+
+    def submit_card(self, selected_option):
+        current_q = self.current_exam[self.current_question_index]
+        self.deck.review(current_q["id"], selected_option == current_q["correct_answer"])
+        study.save_file(self.deck, DECK_PATH)
+        qid = self.next_card()
+        if qid is None:
+            messagebox.showinfo("Study", f"All caught up! Reviewed {len(self.current_exam)} card(s).")
+            self.studying = False
+            self.show_frame("start")
+            return
+        self.current_exam.append(self.question_map[qid])
+        self.current_question_index += 1
+        self.load_question()
+
+    def exam_length(self):
+        # Adaptive practice only knows its next question, but always runs the full length
+        if self.studying:
+            return len(self.current_exam) - 1 + self.deck.due_count()
+        return exam_logic.EXAM_LENGTH if self.adaptive else len(self.current_exam)
+
     def load_question(self):
         """Loads the current question into the quiz frame."""
         question_data = self.current_exam[self.current_question_index]
-        is_last = self.current_question_index == len(self.current_exam) - 1
+        is_last = not self.studying and self.current_question_index == self.exam_length() - 1
         self.quiz_frame.update_question(
             question_data, 
             self.current_question_index + 1, 
-            len(self.current_exam),
+            self.exam_length(),
             is_last
         )
 
     def submit_answer(self, selected_option):
         """Records the user's answer."""
         # This is called when 'Next' or 'Submit' is clicked, passing the selected value
+        if self.studying:
+            self.submit_card(selected_option)
+            return
         current_q = self.current_exam[self.current_question_index]
         
         # Check correctness
@@ -90,6 +177,13 @@ class App(ctk.CTk):
             })
             
         self.user_answers[current_q["id"]] = selected_option
+        weak_areas.record(self.history, current_q["id"], selected_option == current_q["correct_answer"])
+
+        if self.adaptive:
+            self.answered.append((current_q["id"], selected_option == current_q["correct_answer"]))
+            next_id = self.engine.next_question(self.answered)
+            if next_id is not None:
+                self.current_exam.append(self.question_map[next_id])
         
         # Move to next or finish
         if self.current_question_index < len(self.current_exam) - 1:
@@ -105,7 +199,14 @@ class App(ctk.CTk):
     def finish_exam(self):
         """Calculates score and shows results."""
         passed = self.score >= 24
-        self.results_frame.update_results(self.score, len(self.current_exam), passed, self.incorrect_answers)
+        # Missed questions go into the study deck
+        missed = [q["id"] for q in self.current_exam if self.user_answers.get(q["id"]) not in (None, q["correct_answer"])]
+        if missed:
+            self.deck.add(missed)
+            study.save_file(self.deck, DECK_PATH)
+        weak_areas.save_file(self.history, HISTORY_PATH)
+        ability = self.engine.estimate(self.answered) if self.adaptive else None
+        self.results_frame.update_results(self.score, len(self.current_exam), passed, self.incorrect_answers, ability)
         self.show_frame("results")
 
     def restart_exam(self):
@@ -114,13 +215,13 @@ class App(ctk.CTk):
 
 
 class StartFrame(ctk.CTkFrame):
-    def __init__(self, master, start_callback):
+    def __init__(self, master, start_callback, adaptive_callback, study_callback, weak_callback):
         super().__init__(master)
         self.start_callback = start_callback
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(0, weight=1)
-        self.grid_rowconfigure(4, weight=1)
+        self.grid_rowconfigure(7, weight=1)
 
         self.label_title = ctk.CTkLabel(self, text="Alabama Driver License Prep", font=("Roboto", 32, "bold"))
         self.label_title.grid(row=1, column=0, pady=20, padx=20)
@@ -129,7 +230,16 @@ class StartFrame(ctk.CTkFrame):
         self.label_subtitle.grid(row=2, column=0, pady=10)
 
         self.btn_start = ctk.CTkButton(self, text="Start Exam", command=self.start_callback, font=("Roboto", 18), height=50, width=200)
-        self.btn_start.grid(row=3, column=0, pady=40)
+        self.btn_start.grid(row=3, column=0, pady=(40, 10))
+
+        self.btn_adaptive = ctk.CTkButton(self, text="Adaptive Practice", command=adaptive_callback, font=("Roboto", 18), height=50, width=200)
+        self.btn_adaptive.grid(row=4, column=0, pady=10)
+
+        self.btn_study = ctk.CTkButton(self, text="Study Missed", command=study_callback, font=("Roboto", 18), height=50, width=200)
+        self.btn_study.grid(row=5, column=0, pady=10)
+
+        self.btn_weak = ctk.CTkButton(self, text="Weak Areas", command=weak_callback, font=("Roboto", 18), height=50, width=200)
+        self.btn_weak.grid(row=6, column=0, pady=10)
 
 
 class QuizFrame(ctk.CTkFrame):
@@ -252,12 +362,18 @@ class ResultsFrame(ctk.CTkFrame):
         self.btn_restart = ctk.CTkButton(self, text="Restart Exam", command=self.restart_callback, font=("Roboto", 18), height=50, width=200)
         self.btn_restart.grid(row=5, column=0, pady=20)
 
-    def update_results(self, score, total, passed, incorrect_answers):
+    def update_results(self, score, total, passed, incorrect_answers, ability=None):
         self.label_score.configure(text=f"Score: {score}/{total} ({(score/total)*100:.1f}%)")
-        if passed:
+        if ability:
+            # Adaptive practice: questions matched the taker, so the score says little on its own
+            self.label_title.configure(text="Practice Completed")
+            self.label_status.configure(text=f"Estimated ability: {ability[0]:.2f} (± {ability[1]:.2f})", text_color="#3B8ED0")
+        elif passed:
             self.label_status.configure(text="PASSED", text_color="#2CC985") # Green
         else:
             self.label_status.configure(text="FAILED", text_color="#FF4B4B") # Red
+        if not ability:
+            self.label_title.configure(text="Exam Completed")
 
         # Clear previous review
         for widget in self.review_frame.winfo_children():
@@ -0,0 +1,129 @@
+"""
+Structured JSON logging that never blocks the caller.
+
+Every record goes through a bounded in-memory queue; a single listener thread
+per process formats it and writes it to stdout (or LOG_FILE). If the sink falls
+behind and the queue fills up, new records are dropped and counted rather than
+stalling a request thread.
+
+Each line is one JSON object:
+
+    {"ts": "...", "level": "INFO", "logger": "main", "msg": "request",
+     "request_id": "3f0c...", "exam_id": "9a1b...", "route": "/quiz", "duration_ms": 1.7}
+
+Levels: LOG_LEVEL sets the default, LOG_LEVELS overrides per module,
+e.g. LOG_LEVELS="pdf_processor=DEBUG,notifications=WARNING".
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+
+# Per-request context, set by the web app and attached to every record
+request_id = contextvars.ContextVar("request_id", default=None)
+exam_id = contextvars.ContextVar("exam_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Captures context on the calling thread, then hands off without ever waiting."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        rid, eid = request_id.get(), exam_id.get()
+        if rid is not None and not hasattr(record, "request_id"):
+            record.request_id = rid
+        if eid is not None and not hasattr(record, "exam_id"):
+            record.exam_id = eid
+        # Format the message now (args may be mutable), but leave JSON to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            NonBlockingQueueHandler.dropped += 1
+
+_state = {"handler": None, "listener": None}
+_lock = threading.Lock()
+
+def _sink():
+    path = os.environ.get("LOG_FILE")
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+    return handler
+
+def _start_listener():
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _state["handler"].queue = log_queue
+    listener = logging.handlers.QueueListener(log_queue, _sink(), respect_handler_level=False)
+    listener.start()
+    _state["listener"] = listener
+
+def _stop():
+    # Flush what's queued when the process exits (scripts log right before exiting)
+    if _state["listener"] is not None:
+        _state["listener"].stop()
+
+def _after_fork():
+    # The listener thread didn't survive the fork; give the child its own
+    if _state["handler"] is not None:
+        _start_listener()
+
+def _apply_levels():
+    logging.getLogger().setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+    for item in os.environ.get("LOG_LEVELS", "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(name.strip()).setLevel(level.strip().upper())
+
+def setup():
+    """Routes the root logger through the non-blocking JSON pipeline. Safe to call twice."""
+    with _lock:
+        if _state["handler"] is not None:
+            return
+        handler = NonBlockingQueueHandler(None)
+        _state["handler"] = handler
+        _start_listener()
+        root = logging.getLogger()
+        root.addHandler(handler)
+        _apply_levels()
+        os.register_at_fork(after_in_child=_after_fork)
+        atexit.register(_stop)
+
+def dropped():
+    """Records thrown away because the sink couldn't keep up."""
+    return NonBlockingQueueHandler.dropped
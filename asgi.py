@@ -0,0 +1,128 @@
+"""
+ASGI entry point for the web app.
+
+Serves exactly the same Flask app (routes, templates, exam_logic) as main.py,
+but behind an async server:
+
+    uv run uvicorn asgi:app --host 0.0.0.0 --port 10000
+
+The event loop owns every socket, so slow clients cost a coroutine instead of a
+worker. Each request is handed to a thread pool only once its body has been
+read, and the Discord webhook is posted from notifications' background thread,
+so the pool threads never block on network I/O either.
+"""
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from main import app as flask_app
+
+# Flask routes are short CPU-bound bursts; a small pool is plenty
+MAX_THREADS = int(os.environ.get("ASGI_THREADS", "16"))
+
+class WSGIBridge:
+    """Minimal ASGI -> WSGI adapter that runs the app in a thread pool."""
+
+    def __init__(self, wsgi_app, max_threads=MAX_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = bytearray()
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+
+        loop = asyncio.get_running_loop()
+        status, headers, chunks = await loop.run_in_executor(
+            self.executor, self.run_wsgi, scope, bytes(body)
+        )
+
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"".join(chunks)})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def run_wsgi(self, scope, body):
+        """Runs one request through the WSGI app. Called in a pool thread."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        result = self.wsgi_app(self.build_environ(scope, body), start_response)
+        try:
+            chunks = list(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return response["status"], response["headers"], chunks
+
+    @staticmethod
+    def build_environ(scope, body):
+        server_name, server_port = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope["query_string"].decode("latin-1"),
+            "SERVER_NAME": server_name,
+            "SERVER_PORT": str(server_port),
+            "SERVER_PROTOCOL": f"HTTP/{scope['http_version']}",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": True,
+            "wsgi.run_once": False,
+        }
+        if scope.get("client"):
+            environ["REMOTE_ADDR"] = scope["client"][0]
+
+        for raw_name, raw_value in scope["headers"]:
+            name = raw_name.decode("latin-1").upper().replace("-", "_")
+            value = raw_value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+                continue
+            if name == "CONTENT_LENGTH":
+                continue
+            key = "HTTP_" + name
+            if key in environ:
+                # Repeated headers are folded; cookies use their own separator
+                separator = "; " if key == "HTTP_COOKIE" else ","
+                value = environ[key] + separator + value
+            environ[key] = value
+        return environ
+
+app = WSGIBridge(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", "10000")))
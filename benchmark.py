@@ -0,0 +1,281 @@
+"""
+Benchmark suite for the exam engine, the web routes and the build pipeline.
+
+Times (per operation, median of several repeats):
+  - exam_logic.load_questions and generate_exam for several pool sizes
+    (synthetic pools from generate_pool.py)
+  - every Flask route through the test client
+  - session cookie encode/decode
+  - generate_questions.get_page_number against a synthetic manual
+  - pdf_processor.extract_text_from_pdf on a synthetic PDF
+
+Usage:
+    uv run benchmark.py --out bench_results.json
+    uv run benchmark.py --compare bench_results.json --threshold 0.10
+
+--compare prints the change against a saved run and exits with status 1 if
+anything got slower by more than --threshold.
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+# Keep per-request access logs out of the timings and the output
+os.environ.setdefault("LOG_LEVELS", "main=WARNING")
+# Replayed /answer calls aren't real answers
+os.environ.setdefault("ANSWER_LOG_DIR", "")
+os.environ.setdefault("USER_STORE_PATH", "")
+
+import exam_logic
+import generate_pool
+
+POOL_SIZES = (164, 1_000, 10_000, 100_000)
+
+def measure(func, repeat=5, min_time=0.05):
+    """Median and best seconds per call, timeit-style (loops auto-scaled to min_time)."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    runs = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        runs.append((time.perf_counter() - started) / loops)
+    return {"median_s": statistics.median(runs), "min_s": min(runs), "loops": loops, "repeat": repeat}
+
+# --- Fixtures ---
+
+def scale_pool(base, size):
+    """The real pool, topped up with synthetic questions until it has `size`."""
+    if size <= len(base):
+        return base[:size]
+    profile = generate_pool.PoolProfile(base)
+    extra = generate_pool.iter_questions(size - len(base), profile, seed=size, start_id=len(base) + 1)
+    return base + list(extra)
+
+def synthetic_pdf(pages=40, lines_per_page=45):
+    """A valid PDF with plain text pages, built by hand so no PDF writer is needed."""
+    def escape(text):
+        return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None, # Pages, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_refs = []
+    for page in range(pages):
+        lines = [
+            f"Page {page + 1} line {line + 1}: Always signal at least 100 feet before turning and yield to pedestrians."
+            for line in range(lines_per_page)
+        ]
+        text = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({escape(l)}) '" for l in lines) + " ET"
+        stream = text.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_ref
+        )
+        page_refs.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_refs))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+@contextlib.contextmanager
+def synthetic_manual(questions, workdir):
+    """Runs the block inside `workdir` with a documents/manual_text.txt built from the pool."""
+    os.makedirs(os.path.join(workdir, "documents"), exist_ok=True)
+    with open(os.path.join(workdir, "documents", "manual_text.txt"), "w", encoding="utf-8") as f:
+        for page in range(1, 121):
+            f.write(f"\n[[PAGE_{page}]]\n")
+            for q in questions[(page - 1) % len(questions)::120]:
+                f.write(q["explanation"] + "\n")
+    previous = os.getcwd()
+    os.chdir(workdir)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+# --- Benchmarks ---
+
+def bench_exam_logic(results, base_pool, workdir):
+    for size in POOL_SIZES:
+        pool = scale_pool(base_pool, size)
+        path = os.path.join(workdir, f"pool_{size}.json")
+        with open(path, "w") as f:
+            json.dump(pool, f)
+        results[f"load_questions[{size}]"] = measure(lambda: exam_logic.load_questions(path), repeat=3)
+        results[f"generate_exam[{size}]"] = measure(lambda: exam_logic.generate_exam(pool))
+
+def bench_routes(results):
+    import main
+    main.wait_until_ready(timeout=60)
+    app = main.app
+
+    # Cookies captured at fixed points so every call replays the same state
+    setup = app.test_client()
+    setup.get("/start")
+    fresh_cookie = setup.get_cookie("session").value
+    with setup.session_transaction() as sess:
+        first = main.QUESTION_MAP[sess["exam_ids"][0]]
+    for _ in range(6):
+        setup.post("/answer", data={"option": "wrong"})
+    setup.get("/results")
+    finished_cookie = setup.get_cookie("session").value
+
+    client = app.test_client(use_cookies=False)
+    fresh = {"Cookie": f"session={fresh_cookie}"}
+    finished = {"Cookie": f"session={finished_cookie}"}
+
+    results["route[/]"] = measure(lambda: client.get("/"))
+    results["route[/start]"] = measure(lambda: client.get("/start"))
+    results["route[/quiz]"] = measure(lambda: client.get("/quiz", headers=fresh))
+    results["route[/answer]"] = measure(
+        lambda: client.post("/answer", data={"option": first["correct_answer"]}, headers=fresh)
+    )
+    results["route[/results]"] = measure(lambda: client.get("/results", headers=finished))
+
+    # Session cookie codec on a mid-exam session with the maximum wrong answers
+    serializer = app.session_interface.get_signing_serializer(app)
+    state = {
+        "exam_token": "0123456789abcdef",
+        "exam_ids": list(main.QUESTION_MAP)[:30],
+        "current_index": 20,
+        "score": 14,
+        "answers": {str(qid): main.QUESTION_MAP[qid]["options"][1] for qid in list(main.QUESTION_MAP)[:20]},
+        "incorrect_answers": [{"id": qid, "user_answer": "x"} for qid in list(main.QUESTION_MAP)[:6]],
+    }
+    token = serializer.dumps(state)
+    results["session_encode"] = measure(lambda: serializer.dumps(state))
+    results["session_decode"] = measure(lambda: serializer.loads(token))
+
+def bench_page_lookup(results, base_pool, workdir):
+    with synthetic_manual(base_pool, workdir):
+        sys.modules.pop("generate_questions", None)
+        # Importing builds the normalized manual and page map once
+        started = time.perf_counter()
+        generate_questions = importlib.import_module("generate_questions")
+        elapsed = time.perf_counter() - started
+        results["generate_questions_import"] = {"median_s": elapsed, "min_s": elapsed, "loops": 1, "repeat": 1}
+        snippets = [q["explanation"] for q in base_pool]
+        index = iter(range(10**9))
+        results["get_page_number"] = measure(
+            lambda: generate_questions.get_page_number(snippets[next(index) % len(snippets)])
+        )
+
+def bench_pdf(results):
+    try:
+        import io
+        import pdf_processor
+    except ImportError as e:
+        print(f"Skipping extract_text_from_pdf: {e}")
+        return
+    data = synthetic_pdf()
+    results["extract_text_from_pdf[40 pages]"] = measure(
+        lambda: pdf_processor.extract_text_from_pdf(io.BytesIO(data)), repeat=3
+    )
+
+def run_all():
+    base_pool = exam_logic.load_questions()
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, step in (
+            ("exam_logic", lambda: bench_exam_logic(results, base_pool, workdir)),
+            ("routes", lambda: bench_routes(results)),
+            ("page lookup", lambda: bench_page_lookup(results, base_pool, workdir)),
+            ("pdf", lambda: bench_pdf(results)),
+        ):
+            print(f"Running {name} benchmarks...")
+            step()
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+# --- Reporting ---
+
+def format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+def print_results(run):
+    print(f"{'benchmark':<36} {'median':>12} {'best':>12}")
+    for name, r in run["results"].items():
+        print(f"{name:<36} {format_time(r['median_s']):>12} {format_time(r['min_s']):>12}")
+
+def compare(run, baseline, threshold):
+    """Prints the change per benchmark. Returns the names that regressed."""
+    regressions = []
+    print(f"{'benchmark':<36} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, r in run["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<36} {'-':>12} {format_time(r['median_s']):>12} {'new':>9}")
+            continue
+        change = r["median_s"] / before["median_s"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<36} {format_time(before['median_s']):>12} {format_time(r['median_s']):>12} "
+            f"{change:>+8.1%}{flag}"
+        )
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--out", help="Write results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --out")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Allowed slowdown before failing (default 0.10)")
+    args = parser.parse_args()
+
+    run = run_all()
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(run, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+    else:
+        print_results(run)
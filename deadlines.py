@@ -0,0 +1,173 @@
+"""
+Deadlines for timed exams, kept in a hierarchical timing wheel.
+
+The deadline that counts travels in the (signed) session cookie and is
+checked by each request, so it holds whichever worker serves it. The wheel
+is for exams nobody comes back to: when one expires, the expiry callback
+finishes it server-side.
+
+The wheel has LEVELS rings of 64 slots. Level 0 slots are one tick
+(DEADLINE_TICK_S) wide, each level up 64 times wider, so four levels at one
+second reach about 194 days. Scheduling drops the entry in the slot for its
+expiry time at the coarsest level that can hold it, and cancelling just
+marks it dead: both O(1), however many exams are open. Each tick empties one
+level 0 slot; whenever a level wraps, the next level's current slot is
+spread out over the levels below. Nothing is ever scanned or sorted.
+
+A thread per process advances the wheel (started again after a fork).
+"""
+import logging
+import math
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+TICK = float(os.environ.get("DEADLINE_TICK_S", "1"))
+SLOTS = 64
+LEVELS = 4
+_BITS = 6   # log2(SLOTS)
+
+class TimingWheel:
+    def __init__(self, tick=TICK, start=None, levels=LEVELS):
+        self.tick = tick
+        self.start = time.time() if start is None else start
+        self.levels = levels
+        self._wheels = [[[] for _ in range(SLOTS)] for _ in range(levels)]
+        self._entries = {}   # key -> [expiry tick, payload, alive]
+        self._now = 0        # last tick processed
+
+    def _tick_of(self, when):
+        return max(math.ceil((when - self.start) / self.tick), self._now + 1)
+
+    def _place(self, key, entry):
+        expires = entry[0]
+        delta = expires - self._now
+        for level in range(self.levels):
+            if delta < SLOTS ** (level + 1) or level == self.levels - 1:
+                if level == self.levels - 1:
+                    # Further out than the wheel reaches: park it as far as it goes, it cascades back later
+                    expires = min(expires, self._now + SLOTS ** self.levels - 1)
+                slot = (expires >> (_BITS * level)) & (SLOTS - 1)
+                self._wheels[level][slot].append((key, entry))
+                return
+
+    def schedule(self, key, when, payload=None):
+        """Calls for `key` to expire at `when` (epoch seconds), replacing any earlier deadline."""
+        self.cancel(key)
+        entry = [self._tick_of(when), payload, True]
+        self._entries[key] = entry
+        self._place(key, entry)
+
+    def cancel(self, key):
+        """True if `key` had a pending deadline (which now won't fire)."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        entry[2] = False
+        return True
+
+    def update(self, key, payload):
+        """Replaces the payload of a pending deadline. Returns False if there isn't one."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        entry[1] = payload
+        return True
+
+    def _cascade(self, level):
+        # Level `level` has come round to a new slot: hand its entries down
+        slot = (self._now >> (_BITS * level)) & (SLOTS - 1)
+        entries, self._wheels[level][slot] = self._wheels[level][slot], []
+        for key, entry in entries:
+            if entry[2]:
+                self._place(key, entry)
+
+    def advance(self, now):
+        """Moves the wheel up to `now` and returns [(key, payload)] of everything that expired."""
+        target = math.floor((now - self.start) / self.tick)
+        expired = []
+        while self._now < target:
+            if not self._entries:
+                # Nothing pending: skip the idle stretch (only dead entries left in the slots)
+                self._wheels = [[[] for _ in range(SLOTS)] for _ in range(self.levels)]
+                self._now = target
+                break
+            self._now += 1
+            for level in range(1, self.levels):
+                if self._now & ((1 << (_BITS * level)) - 1):
+                    break
+                self._cascade(level)
+            slot = self._now & (SLOTS - 1)
+            entries, self._wheels[0][slot] = self._wheels[0][slot], []
+            for key, entry in entries:
+                if not entry[2]:
+                    continue
+                if entry[0] > self._now:
+                    # Parked beyond the wheel's reach; not due yet
+                    self._place(key, entry)
+                    continue
+                entry[2] = False
+                del self._entries[key]
+                expired.append((key, entry[1]))
+        return expired
+
+    def __len__(self):
+        return len(self._entries)
+
+# --- Per-process wheel with its own ticker thread ---
+
+_wheel = TimingWheel()
+_lock = threading.Lock()
+_ticker = None
+_ticker_pid = None
+_callback = None
+
+def on_expire(callback):
+    """Sets the function called with (key, payload) for each expired deadline, on the ticker thread."""
+    global _callback
+    _callback = callback
+
+def _ensure_ticker():
+    global _ticker, _ticker_pid, _wheel
+    if _ticker_pid == os.getpid() and _ticker.is_alive():
+        return
+    with _lock:
+        if _ticker_pid == os.getpid() and _ticker.is_alive():
+            return
+        if _ticker_pid is not None and _ticker_pid != os.getpid():
+            # Forked: the parent's deadlines are the parent's to expire
+            _wheel = TimingWheel()
+        _ticker = threading.Thread(target=_run, name="deadline-wheel", daemon=True)
+        _ticker_pid = os.getpid()
+        _ticker.start()
+
+def _run():
+    while True:
+        time.sleep(TICK)
+        with _lock:
+            expired = _wheel.advance(time.time())
+        for key, payload in expired:
+            try:
+                if _callback:
+                    _callback(key, payload)
+            except Exception:
+                log.exception("Deadline callback failed for %s", key)
+
+def schedule(key, when, payload=None):
+    _ensure_ticker()
+    with _lock:
+        _wheel.schedule(key, when, payload)
+
+def cancel(key):
+    with _lock:
+        return _wheel.cancel(key)
+
+def update(key, payload):
+    with _lock:
+        return _wheel.update(key, payload)
+
+def pending():
+    """Deadlines waiting in this process."""
+    return len(_wheel)
@@ -0,0 +1,67 @@
+"""
+Parameter recovery check for irt.py: simulates answers from known item
+parameters over the real pool and sampler, fits, and compares.
+"""
+import sys
+import time
+
+import numpy as np
+
+import exam_logic
+import irt
+import item_analysis
+import validate_sampling
+
+N_EXAMS = 200_000
+
+def simulate(questions, a, b, c, n_exams, seed):
+    rng = np.random.default_rng(seed)
+    pool = validate_sampling.Pool(questions)
+    ids = np.array([q["id"] for q in questions])
+    exams, cols, right = [], [], []
+    for counts, picks in validate_sampling.vectorized_exams(pool, n_exams, seed=seed):
+        theta = rng.normal(0, 1, len(picks))
+        p = c[picks] + (1 - c[picks]) / (1 + np.exp(-a[picks] * (theta[:, None] - b[picks])))
+        exams.append(np.repeat(np.arange(len(picks)) + sum(map(len, exams)) // 30, 30))
+        cols.append(picks.ravel())
+        right.append((rng.random(p.shape) < p).ravel())
+    cols = np.concatenate(cols)
+    right = np.concatenate(right).astype(np.int8)
+    return item_analysis.Responses(questions, np.concatenate(exams), ids[cols], np.zeros_like(cols), right)
+
+def check(model, a, b, c, responses):
+    started = time.perf_counter()
+    params, _ = irt.fit(responses, model)
+    elapsed = time.perf_counter() - started
+    fitted = {k: np.array([params["items"][str(q["id"])][k] for q in responses.questions]) for k in "abc"}
+    rmse_a = np.sqrt(np.mean((fitted["a"] - a) ** 2))
+    rmse_b = np.sqrt(np.mean((fitted["b"] - b) ** 2))
+    print(f"{model}: {params['iterations']} iterations in {elapsed:.1f}s, RMSE a={rmse_a:.3f} b={rmse_b:.3f}"
+          + (f" c={np.sqrt(np.mean((fitted['c'] - c) ** 2)):.3f}" if model == "3pl" else ""))
+
+    # Warm start from the fit: should converge almost immediately
+    started = time.perf_counter()
+    again, _ = irt.fit(responses, model, init=params)
+    print(f"  warm start: {again['iterations']} iterations in {time.perf_counter() - started:.1f}s")
+    return rmse_a, rmse_b
+
+questions = exam_logic.load_questions()
+rng = np.random.default_rng(7)
+m = len(questions)
+a = rng.lognormal(0, 0.3, m)
+b = rng.normal(-1, 1, m)
+
+ok = True
+responses = simulate(questions, a, b, np.zeros(m), N_EXAMS, seed=1)
+rmse_a, rmse_b = check("2pl", a, b, np.zeros(m), responses)
+ok &= rmse_a < 0.1 and rmse_b < 0.1
+
+c = rng.uniform(0.1, 0.3, m)
+responses = simulate(questions, a, b, c, N_EXAMS, seed=2)
+rmse_a, rmse_b = check("3pl", a, b, c, responses)
+ok &= rmse_a < 0.25 and rmse_b < 0.35
+
+if not ok:
+    print("FAILURE: parameters not recovered")
+    sys.exit(1)
+print("SUCCESS: parameters recovered.")
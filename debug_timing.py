@@ -0,0 +1,44 @@
+import os
+import re
+
+# Must be set before main is imported
+os.environ["SERVER_TIMING"] = "1"
+os.environ["EXAM_BUFFER_SIZE"] = "0" # Generate inline so exam_logic's phases show up
+
+import main
+
+EXPECTED_PHASES = {
+    "/start": ["session-decode", "exam", "categorize", "sample", "session-encode", "total"],
+    "/quiz": ["session-decode", "lookup", "render", "session-encode", "total"],
+    "/answer": ["session-decode", "lookup", "session-encode", "total"],
+    "/results": ["session-decode", "lookup", "estimate", "render", "session-encode", "total"],
+}
+
+def phases_of(response):
+    header = response.headers.get("Server-Timing")
+    if not header:
+        return {}
+    return {
+        m.group(1): float(m.group(2))
+        for m in re.finditer(r"([\w-]+);dur=([\d.]+)", header)
+    }
+
+client = main.app.test_client()
+responses = {"/start": client.get("/start"), "/quiz": client.get("/quiz")}
+with client.session_transaction() as sess:
+    first_id = sess["exam_ids"][0]
+responses["/answer"] = client.post("/answer", data={"option": main.QUESTION_MAP[first_id]["correct_answer"]})
+responses["/results"] = client.get("/results")
+
+failed = False
+for route, expected in EXPECTED_PHASES.items():
+    phases = phases_of(responses[route])
+    missing = [name for name in expected if name not in phases]
+    print(f"{route}: {responses[route].headers.get('Server-Timing')}")
+    if missing:
+        print(f"FAILED: {route} is missing phases {missing}")
+        failed = True
+
+if failed:
+    exit(1)
+print("SUCCESS: All phases present.")
@@ -0,0 +1,147 @@
+"""
+Ring buffer of pre-generated exams.
+
+A background thread keeps up to `capacity` ready-made exams (lists of question
+IDs) so /start only has to pop one. When the buffer runs dry the exam is
+generated inline, exactly as before.
+
+Every buffered exam comes from an independent exam_logic.generate_exam call
+and each one is handed out at most once, so the exams users see have the same
+distribution as generating on demand. After a fork the inherited contents are
+thrown away: otherwise every gunicorn worker would serve copies of the same
+exams.
+
+Exposure control (`admit`) is applied when an exam is popped, not when it's
+buffered: its K values are current then, and only exams that get served
+count as picks. Each question of the buffered exam goes through the lottery
+and one that's turned down is swapped for another from its category, drawn
+the way exam_logic.sample_admitted would have carried on.
+"""
+import os
+import random
+import threading
+import time
+from collections import deque
+
+import exam_logic
+import metrics
+
+DEFAULT_CAPACITY = int(os.environ.get("EXAM_BUFFER_SIZE", "64"))
+
+EXAM_GENERATION = metrics.Histogram(
+    "exam_generation_seconds", "Time to generate one exam.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1),
+)
+BUFFER_POPS = metrics.Counter("exam_buffer_pops_total", "Exams served to /start, by whether the buffer had one.", ["result"])
+BUFFER_REFILLED = metrics.Counter("exam_buffer_refilled_total", "Exams generated by the refill thread.")
+
+class ExamBuffer:
+    def __init__(self, questions, capacity=DEFAULT_CAPACITY, low_water=None, admit=None):
+        self.questions = questions
+        self.admit = admit
+        self._category_of = {q["id"]: q["category"] for q in questions}
+        self._members = {}
+        for q in questions:
+            self._members.setdefault(q["category"], []).append(q)
+        self.capacity = capacity
+        # Refill once the buffer drops to a quarter full
+        self.low_water = capacity // 4 if low_water is None else low_water
+
+        self._exams = deque(maxlen=capacity)
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+        self.hits = 0
+        self.misses = 0
+        self.refilled = 0
+        self.refill_seconds = 0.0
+
+    def _generate(self):
+        started = time.perf_counter()
+        # Without exposure control: that's for pop, when the exam is actually served
+        exam = [q["id"] for q in exam_logic.generate_exam(self.questions)]
+        EXAM_GENERATION.observe(time.perf_counter() - started)
+        return exam
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            if self._pid != os.getpid():
+                # Forked: drop exams shared with the parent and start counting afresh
+                self._exams.clear()
+                self._wakeup = threading.Event()
+                self.hits = self.misses = self.refilled = 0
+                self.refill_seconds = 0.0
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="exam-buffer", daemon=True)
+            self._thread.start()
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while len(self._exams) < self.capacity:
+                started = time.perf_counter()
+                exam = self._generate()
+                self.refill_seconds += time.perf_counter() - started
+                self._exams.append(exam)
+                self.refilled += 1
+                BUFFER_REFILLED.inc()
+
+    def pop(self):
+        """Returns the question IDs for a new exam."""
+        if not self.questions:
+            return []
+        self._ensure_worker()
+        try:
+            exam = self._exams.popleft()
+            self.hits += 1
+            BUFFER_POPS.inc(result="hit")
+        except IndexError:
+            exam = self._generate()
+            self.misses += 1
+            BUFFER_POPS.inc(result="miss")
+        if len(self._exams) <= self.low_water:
+            self._wakeup.set()
+        return self._admit(exam) if self.admit else exam
+
+    def _admit(self, exam):
+        """Runs the exposure lottery over `exam`, replacing turned-down questions in place."""
+        turned_down = {}
+        for i, qid in enumerate(exam):
+            if not self.admit(qid):
+                turned_down.setdefault(self._category_of[qid], []).append(i)
+        if not turned_down:
+            return exam
+        taken = set(exam)
+        for category, slots in turned_down.items():
+            members = self._members[category]
+            # sample_admitted draws up to 3k for k questions; the exam's k were the first of those
+            k = sum(self._category_of[qid] == category for qid in exam)
+            drawn = random.sample(members, min(len(members), 3 * k))
+            for q in drawn:
+                if not slots:
+                    break
+                if q["id"] not in taken and self.admit(q["id"]):
+                    exam[slots.pop()] = q["id"]
+            # Whatever is still turned down stays, as sample_admitted fills from the rejected picks
+        return exam
+
+    def stats(self):
+        served = self.hits + self.misses
+        return {
+            "buffered": len(self._exams),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / served if served else 0.0,
+            "refilled": self.refilled,
+            # Exams per second the refill thread can produce
+            "refill_rate": self.refilled / self.refill_seconds if self.refill_seconds else 0.0,
+        }
@@ -1,7 +1,19 @@
 import json
+import math
 import random
 import os
 
+import timing
+
+# Exam blueprint (matches the official written test)
+EXAM_LENGTH = 30
+PASS_RATE = 0.8
+CATEGORY_RANGES = {
+    "Road Signs & Signals": (5, 8),
+    "Traffic Laws": (10, 12),
+    "Safe Driving Practices": (10, 12),
+}
+
 def load_questions(filepath="question_pool/questions.json"):
     """Loads questions from the JSON file."""
     if not os.path.exists(filepath):
@@ -10,18 +22,37 @@ def load_questions(filepath="question_pool/questions.json"):
     with open(filepath, "r") as f:
         return json.load(f)
 
-def generate_exam(questions):
+def sample_admitted(population, k, admit=None, rng=random):
+    """
+    k distinct items of `population`, at random. With `admit` (see
+    exposure.ExposureControl.admit), each pick has to pass it; if too few
+    do, the rest are filled from the rejected picks.
+    """
+    k = min(k, len(population))
+    if admit is None:
+        return rng.sample(population, k)
+    chosen, rejected = [], []
+    for item in rng.sample(population, min(len(population), 3 * k)):
+        if len(chosen) == k:
+            break
+        (chosen if admit(item["id"]) else rejected).append(item)
+    return chosen + rejected[:k - len(chosen)]
+
+def generate_exam(questions, admit=None):
     """
     Generates a 30-question exam with the following distribution:
     - Road Signs & Signals: 5-8 questions
     - Traffic Laws: 10-12 questions
     - Safe Driving Practices: 10-12 questions
+
+    `admit` is an optional exposure-control lottery for each picked question.
     """
     
     # Categorize questions
-    road_signs = [q for q in questions if q["category"] == "Road Signs & Signals"]
-    traffic_laws = [q for q in questions if q["category"] == "Traffic Laws"]
-    safe_driving = [q for q in questions if q["category"] == "Safe Driving Practices"]
+    with timing.phase("categorize"):
+        road_signs = [q for q in questions if q["category"] == "Road Signs & Signals"]
+        traffic_laws = [q for q in questions if q["category"] == "Traffic Laws"]
+        safe_driving = [q for q in questions if q["category"] == "Safe Driving Practices"]
     
     # Determine counts for this session
     # We need a total of 30.
@@ -30,24 +61,102 @@ def generate_exam(questions):
     # Strategy: Pick a random number for two categories, calculate the third.
     # If the third is out of bounds, retry.
     
+    min_signs, max_signs = CATEGORY_RANGES["Road Signs & Signals"]
+    min_laws, max_laws = CATEGORY_RANGES["Traffic Laws"]
+    min_safe, max_safe = CATEGORY_RANGES["Safe Driving Practices"]
+
     while True:
-        n_signs = random.randint(5, 8)
-        n_laws = random.randint(10, 12)
-        n_safe = 30 - n_signs - n_laws
+        n_signs = random.randint(min_signs, max_signs)
+        n_laws = random.randint(min_laws, max_laws)
+        n_safe = EXAM_LENGTH - n_signs - n_laws
         
-        if 10 <= n_safe <= 12:
+        if min_safe <= n_safe <= max_safe:
             break
             
     # Select questions
-    selected_signs = random.sample(road_signs, min(n_signs, len(road_signs)))
-    selected_laws = random.sample(traffic_laws, min(n_laws, len(traffic_laws)))
-    selected_safe = random.sample(safe_driving, min(n_safe, len(safe_driving)))
-    
-    exam_questions = selected_signs + selected_laws + selected_safe
-    random.shuffle(exam_questions)
+    with timing.phase("sample"):
+        selected_signs = sample_admitted(road_signs, n_signs, admit)
+        selected_laws = sample_admitted(traffic_laws, n_laws, admit)
+        selected_safe = sample_admitted(safe_driving, n_safe, admit)
+        
+        exam_questions = selected_signs + selected_laws + selected_safe
+        random.shuffle(exam_questions)
     
     return exam_questions
 
+def valid_category_counts():
+    """
+    Every per-category count generate_exam can pick, as dicts in
+    CATEGORY_RANGES order. The retry loop makes each one equally likely.
+    """
+    *drawn, last = CATEGORY_RANGES
+    combos = [()]
+    for category in drawn:
+        low, high = CATEGORY_RANGES[category]
+        combos = [c + (n,) for c in combos for n in range(low, high + 1)]
+
+    low, high = CATEGORY_RANGES[last]
+    valid = []
+    for combo in combos:
+        remaining = EXAM_LENGTH - sum(combo)
+        if low <= remaining <= high:
+            valid.append(dict(zip(CATEGORY_RANGES, combo + (remaining,))))
+    return valid
+
+def max_wrong_answers(total):
+    """
+    Number of wrong answers allowed before the exam is failed.
+    e.g. 30 questions -> 24 needed -> 6 wrong allowed -> 7th wrong kills it.
+    """
+    return total - int(total * PASS_RATE)
+
+def estimate_pass_probability(category_accuracy, n_sims=100_000, confidence=0.95, seed=None):
+    """
+    Monte Carlo estimate of the chance to pass one exam, given the
+    probability of answering a question right in each category.
+
+    Each simulated exam draws its category split the way generate_exam does,
+    then the number right per category. The early-fail rule in submit_answer
+    ends the exam at the 7th wrong answer, which fails it anyway, so only the
+    final count matters and question order isn't simulated.
+
+    Categories missing from `category_accuracy` use the mean of the given ones.
+    Returns {"probability", "low", "high", "simulations"}, the interval being a
+    Wilson score interval at `confidence`. The default 100k simulations take
+    about 20 ms and give an interval within +/-0.3 points; cost grows linearly.
+    """
+    import numpy as np
+    from statistics import NormalDist
+
+    if not category_accuracy:
+        raise ValueError("category_accuracy needs at least one category")
+    fallback = sum(category_accuracy.values()) / len(category_accuracy)
+    accuracy = np.array([category_accuracy.get(c, fallback) for c in CATEGORY_RANGES], dtype=np.float64)
+    if ((accuracy < 0) | (accuracy > 1)).any():
+        raise ValueError("accuracies must be between 0 and 1")
+
+    rng = np.random.default_rng(seed)
+    splits = np.array([list(c.values()) for c in valid_category_counts()])
+    # Every valid split is equally likely, so count how many exams get each one
+    per_split = rng.multinomial(n_sims, np.full(len(splits), 1 / len(splits)))
+
+    needed = EXAM_LENGTH - max_wrong_answers(EXAM_LENGTH)
+    passes = 0
+    for split, n in zip(splits, per_split):
+        correct = sum(rng.binomial(k, p, size=n) for k, p in zip(split, accuracy))
+        passes += int(np.count_nonzero(correct >= needed))
+
+    p = passes / n_sims
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    centre = (p + z * z / (2 * n_sims)) / (1 + z * z / n_sims)
+    spread = z * math.sqrt(p * (1 - p) / n_sims + z * z / (4 * n_sims * n_sims)) / (1 + z * z / n_sims)
+    return {
+        "probability": p,
+        "low": max(0.0, centre - spread),
+        "high": min(1.0, centre + spread),
+        "simulations": n_sims,
+    }
+
 if __name__ == "__main__":
     # Test the logic
     try:
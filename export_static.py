@@ -0,0 +1,118 @@
+"""
+Exports the web app as a static site that can be served from any CDN.
+
+The pages are rendered from the same Jinja templates as main.py, the question
+pool is split into one JSON file per category, and static/js/exam_engine.js
+takes over the work of /start, /answer and /results in the browser.
+
+Usage:
+    uv run export_static.py [--out dist]
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+
+import exam_logic
+from main import app, ALL_QUESTIONS
+
+# Endpoint -> page in the exported site. Links are relative so the export
+# can be hosted under any path prefix.
+STATIC_PAGES = {
+    "index": "index.html",
+    "start_exam": "quiz.html?new=1",
+    "quiz": "quiz.html",
+    "submit_answer": "quiz.html",
+    "results": "results.html",
+}
+
+# Placeholder question rendered into quiz.html, filled in by the JS engine
+PLACEHOLDER_QUESTION = {
+    "category": "",
+    "question": "",
+    "options": ["", "", "", ""],
+    "correct_answer": "",
+    "image": None,
+}
+
+def category_slug(category):
+    """'Road Signs & Signals' -> 'road-signs-signals'"""
+    return re.sub(r"[^a-z0-9]+", "-", category.lower()).strip("-")
+
+def static_url_for(endpoint, **values):
+    if endpoint == "static":
+        return "static/" + values["filename"]
+    return STATIC_PAGES[endpoint]
+
+def render_pages():
+    """Renders the three pages with links rewritten for the static site."""
+    # Separate environment (and template cache) so main.py's url_for is untouched
+    env = app.jinja_env.overlay(cache_size=0)
+    env.globals = {**app.jinja_env.globals, "url_for": static_url_for}
+
+    pages = {
+        "index.html": {},
+        "quiz.html": {
+            "question": PLACEHOLDER_QUESTION,
+            "index": 1,
+            "total": exam_logic.EXAM_LENGTH,
+        },
+        "results.html": {
+            "score": 0,
+            "total": exam_logic.EXAM_LENGTH,
+            "passed": False,
+            "incorrect_answers": [],
+        },
+    }
+    return {
+        name: env.get_template(name).render(static_export=True, **context)
+        for name, context in pages.items()
+    }
+
+def shard_questions(questions):
+    """Groups the pool by category. Returns {category: [questions]}."""
+    shards = {category: [] for category in exam_logic.CATEGORY_RANGES}
+    for q in questions:
+        shards.setdefault(q["category"], []).append(q)
+    return shards
+
+def export(out_dir):
+    if not ALL_QUESTIONS:
+        raise RuntimeError("Question pool is empty, nothing to export")
+
+    data_dir = os.path.join(out_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+
+    # Pages
+    for name, html in render_pages().items():
+        with open(os.path.join(out_dir, name), "w", encoding="utf-8") as f:
+            f.write(html)
+
+    # Assets (css, images and the JS engine)
+    shutil.copytree(app.static_folder, os.path.join(out_dir, "static"), dirs_exist_ok=True)
+
+    # Question pool, one file per category so the browser only fetches what it samples
+    manifest = {
+        "exam_length": exam_logic.EXAM_LENGTH,
+        "pass_rate": exam_logic.PASS_RATE,
+        "category_ranges": exam_logic.CATEGORY_RANGES,
+        "categories": {},
+    }
+    for category, questions in shard_questions(ALL_QUESTIONS).items():
+        filename = category_slug(category) + ".json"
+        with open(os.path.join(data_dir, filename), "w", encoding="utf-8") as f:
+            json.dump(questions, f, separators=(",", ":"))
+        manifest["categories"][category] = filename
+        print(f"  {category}: {len(questions)} questions -> data/{filename}")
+
+    with open(os.path.join(data_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Static site exported to {out_dir}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the exam as a static site.")
+    parser.add_argument("--out", default="dist", help="Output directory (default: dist)")
+    args = parser.parse_args()
+    export(args.out)
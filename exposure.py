@@ -0,0 +1,190 @@
+"""
+Sympson-Hetter exposure control, shared by every gunicorn worker.
+
+Every question i has a control parameter K_i. When a sampler picks it, the
+question is only used with probability K_i; otherwise the sampler moves on
+to another one. With s_i the share of exams in which i gets picked,
+
+    K_i = min(1, EXPOSURE_MAX_RATE / s_i)
+
+keeps the share of exams that actually show it at or below the target
+rate. s_i is estimated online, from counts kept in a memory-mapped file:
+
+    header   per worker slot: pid (int64), time of the last decay (float64),
+             when that process started (float64)
+    counts   per worker slot (float32): exams, picks per question, uses per question
+
+Each worker claims a slot (under flock, once per process) and is the only
+writer of its row, so counting a pick is a plain in-memory add with no
+locking at all. Two threads of one worker can very occasionally lose an
+increment to each other, which doesn't matter for a rate.
+A worker halves its own counts every EXPOSURE_HALF_LIFE_H hours (applied in
+small steps), so the rates follow recent traffic. K is recomputed from the
+sum of all rows at most once a second per worker; samplers only read the
+cached array.
+
+The file is tied to the pool (ID fingerprint in the header) and recreated
+when the pool changes. Set EXPOSURE_FILE to an empty string to turn exposure
+control off.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import random
+import struct
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+import memory
+
+log = logging.getLogger(__name__)
+
+EXPOSURE_FILE = os.environ.get("EXPOSURE_FILE", os.path.join(tempfile.gettempdir(), "alabama-dl-exposure.bin"))
+MAX_RATE = float(os.environ.get("EXPOSURE_MAX_RATE", "0.25"))
+HALF_LIFE = float(os.environ.get("EXPOSURE_HALF_LIFE_H", "24")) * 3600
+MAX_WORKERS = int(os.environ.get("EXPOSURE_SLOTS", "64"))
+# Exams seen (decayed) before exposure control kicks in, so early noise doesn't throttle anything
+MIN_EXAMS = 200
+DECAY_INTERVAL = 60.0
+REFRESH_INTERVAL = 1.0
+
+_MAGIC = b"EXPOSUR2"
+_HEADER = struct.Struct("<8sIII")   # magic, pool fingerprint, questions, slots
+_SLOT = struct.Struct("<qdd")       # pid, last decay, process start
+
+def enabled():
+    return bool(EXPOSURE_FILE)
+
+class ExposureControl:
+    def __init__(self, question_ids, path=EXPOSURE_FILE, max_rate=MAX_RATE, slots=MAX_WORKERS):
+        self.path = path
+        self.max_rate = max_rate
+        self.slots = slots
+        self.ids = list(question_ids)
+        self.index_of = {qid: j for j, qid in enumerate(self.ids)}
+        self.n = len(self.ids)
+        self.fingerprint = zlib.crc32(struct.pack(f"<{self.n}q", *self.ids))
+        self._row_len = 1 + 2 * self.n
+        self._counts_offset = _HEADER.size + slots * _SLOT.size
+        self._size = self._counts_offset + slots * self._row_len * 4
+
+        self._pid = None
+        self._k = np.ones(self.n)
+        self._refresh_at = 0.0
+        self._decay_at = 0.0
+
+    # --- Shared file ---
+
+    def _attach(self):
+        """Maps the file and claims a slot for this process (again after a fork)."""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            header = os.pread(fd, _HEADER.size, 0)
+            expected = _HEADER.pack(_MAGIC, self.fingerprint, self.n, self.slots)
+            if header != expected or os.fstat(fd).st_size != self._size:
+                # New file, or one for another pool: start from zero
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, self._size)
+                os.pwrite(fd, expected, 0)
+            self._map = mmap.mmap(fd, self._size)
+
+            slot_info = np.frombuffer(self._map, dtype=np.dtype([("pid", "<i8"), ("decayed", "<f8"), ("started", "<f8")]),
+                                      count=self.slots, offset=_HEADER.size)
+            mine = None
+            for i, (pid, _, started) in enumerate(slot_info.tolist()):
+                # Free unless that very process is still running: a pid can come back after a container restart
+                if pid == 0 or memory.process_started(pid) != started:
+                    mine = i
+                    break
+            if mine is None:
+                raise RuntimeError(f"All {self.slots} exposure slots are taken")
+            self._slot_info = slot_info
+            self._counts = np.frombuffer(self._map, dtype="<f4", count=self.slots * self._row_len,
+                                         offset=self._counts_offset).reshape(self.slots, self._row_len)
+            self._slot = mine
+            # A dead worker's row is taken over, counts and all; catch up on its decay first
+            self._decay(time.time(), slot_info["decayed"][mine] or time.time())
+            slot_info["pid"][mine] = os.getpid()
+            slot_info["started"][mine] = memory.process_started()
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+        row = self._counts[self._slot]
+        self._exams = row[0:1]
+        self._picks = row[1:1 + self.n]
+        self._uses = row[1 + self.n:]
+        self._pid = os.getpid()
+        self._refresh_at = 0.0
+
+    def _ensure(self):
+        if self._pid != os.getpid():
+            self._attach()
+
+    def _decay(self, now, since):
+        elapsed = now - since
+        if elapsed > 0:
+            self._counts[self._slot] *= np.float32(0.5 ** (elapsed / HALF_LIFE))
+        self._slot_info["decayed"][self._slot] = now
+        self._decay_at = now + DECAY_INTERVAL
+
+    def _refresh(self):
+        totals = self._counts.sum(axis=0, dtype=np.float64)
+        exams = totals[0]
+        if exams >= MIN_EXAMS:
+            pick_rate = totals[1:1 + self.n] / exams
+            with np.errstate(divide="ignore"):
+                k = np.minimum(1.0, self.max_rate / pick_rate)
+        else:
+            k = np.ones(self.n)
+        self._k = k   # swapped in whole; readers never see a half-built array
+        self._refresh_at = time.monotonic() + REFRESH_INTERVAL
+        now = time.time()
+        if now >= self._decay_at:
+            self._decay(now, self._slot_info["decayed"][self._slot])
+
+    # --- Hot path ---
+
+    def admit(self, question_id, rng=random):
+        """
+        The Sympson-Hetter lottery for a question a sampler just picked:
+        counts the pick and returns whether to use it.
+        """
+        j = self.index_of.get(question_id)
+        if j is None:
+            return True
+        self._ensure()
+        if time.monotonic() >= self._refresh_at:
+            self._refresh()
+        self._picks[j] += 1
+        return rng.random() < self._k[j]
+
+    def record(self, question_ids, new_exam=False):
+        """Counts questions as shown to a user (and a new exam, for the first ones)."""
+        self._ensure()
+        if new_exam:
+            self._exams[0] += 1
+        for qid in question_ids:
+            j = self.index_of.get(qid)
+            if j is not None:
+                self._uses[j] += 1
+
+    # --- Reporting ---
+
+    def rates(self):
+        """Per-question share of exams that showed it, and the current K, over all workers."""
+        self._ensure()
+        if time.monotonic() >= self._refresh_at:
+            self._refresh()
+        totals = self._counts.sum(axis=0, dtype=np.float64)
+        exams = totals[0]
+        uses = totals[1 + self.n:] / exams if exams else np.zeros(self.n)
+        return {"exams": exams, "use_rate": uses, "k": self._k.copy()}
+
+    def max_use_rate(self):
+        return float(self.rates()["use_rate"].max(initial=0.0))
@@ -0,0 +1,123 @@
+"""
+Generates large synthetic question pools for scaling tests.
+
+The output has the same schema as question_pool/questions.json, and its
+statistics come from that file: the category mix, the length of questions,
+options and explanations (sampled from the real ones), the share of questions
+with an image and which images they use. Text is stitched together from the
+real pool's vocabulary, so tokenizers, search and the templates see realistic
+input.
+
+Questions are written one at a time, so memory stays flat even for a
+million-question pool.
+
+Usage:
+    uv run generate_pool.py --count 100000 --out question_pool/synthetic_100k.json
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import re
+import time
+
+import exam_logic
+
+WORD_PATTERN = re.compile(r"[A-Za-z0-9'-]+")
+
+class PoolProfile:
+    """What a realistic question looks like, measured from a real pool."""
+
+    def __init__(self, questions):
+        self.categories = sorted({q["category"] for q in questions})
+        counts = [sum(1 for q in questions if q["category"] == c) for c in self.categories]
+        self.category_weights = list(itertools.accumulate(counts))
+
+        self.question_words = [len(WORD_PATTERN.findall(q["question"])) for q in questions]
+        self.option_words = [len(WORD_PATTERN.findall(o)) for q in questions for o in q["options"]]
+        self.explanation_words = [len(WORD_PATTERN.findall(q["explanation"])) for q in questions]
+        self.option_counts = [len(q["options"]) for q in questions]
+
+        # Share of each category's questions that show an image, and which images
+        self.image_rate = {}
+        self.images = {}
+        for category in self.categories:
+            in_category = [q for q in questions if q["category"] == category]
+            with_image = [q["image"] for q in in_category if q.get("image")]
+            self.image_rate[category] = len(with_image) / len(in_category)
+            self.images[category] = sorted(set(with_image))
+
+        vocabulary = {}
+        for q in questions:
+            text = " ".join([q["question"], q["explanation"], *q["options"]])
+            for word in WORD_PATTERN.findall(text):
+                vocabulary[word] = vocabulary.get(word, 0) + 1
+        self.words = list(vocabulary)
+        self.word_weights = list(itertools.accumulate(vocabulary.values()))
+
+    def pick_category(self, rng):
+        return self.categories[bisect.bisect_right(self.category_weights, rng.random() * self.category_weights[-1])]
+
+    def sentence(self, rng, n_words):
+        words = rng.choices(self.words, cum_weights=self.word_weights, k=max(1, n_words))
+        words[0] = words[0].capitalize()
+        return " ".join(words)
+
+def iter_questions(count, profile, seed=None, start_id=1):
+    """Yields `count` synthetic questions."""
+    rng = random.Random(seed)
+    for i in range(count):
+        category = profile.pick_category(rng)
+        n_options = rng.choice(profile.option_counts)
+        options = []
+        while len(options) < n_options:
+            option = profile.sentence(rng, rng.choice(profile.option_words)) + "."
+            if option not in options:
+                options.append(option)
+
+        image = None
+        if profile.images[category] and rng.random() < profile.image_rate[category]:
+            image = rng.choice(profile.images[category])
+
+        yield {
+            "id": start_id + i,
+            "category": category,
+            "question": profile.sentence(rng, rng.choice(profile.question_words)) + rng.choice(("?", ":")),
+            "options": options,
+            "correct_answer": rng.choice(options),
+            "explanation": profile.sentence(rng, rng.choice(profile.explanation_words)) + f". (Page {rng.randint(1, 120)})",
+            "image": image,
+        }
+
+def write_pool(path, count, seed=None, source="question_pool/questions.json"):
+    """Streams a pool of `count` questions to `path` as a JSON array."""
+    profile = PoolProfile(exam_logic.load_questions(source))
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i, question in enumerate(iter_questions(count, profile, seed)):
+            if i:
+                f.write(",\n")
+            f.write(json.dumps(question, ensure_ascii=False))
+        f.write("\n]\n")
+    os.replace(tmp_path, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a large synthetic question pool.")
+    parser.add_argument("--count", type=int, default=10_000, help="Number of questions (default 10000)")
+    parser.add_argument("--out", default=None, help="Output file (default question_pool/synthetic_<count>.json)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for a reproducible pool")
+    parser.add_argument("--source", default="question_pool/questions.json", help="Real pool to take statistics from")
+    args = parser.parse_args()
+
+    out = args.out or os.path.join("question_pool", f"synthetic_{args.count}.json")
+    started = time.perf_counter()
+    write_pool(out, args.count, seed=args.seed, source=args.source)
+    print(f"Wrote {args.count} questions to {out} in {time.perf_counter() - started:.1f}s "
+          f"({os.path.getsize(out) / 1e6:.1f} MB)")
@@ -1,6 +1,12 @@
 import json
+import logging
 import os
 
+import app_logging
+
+app_logging.setup()
+log = logging.getLogger("generate_questions")
+
 questions = []
 
 # --- Logic to extract content and track pages ---
@@ -156,7 +162,7 @@ def get_page_number(text_snippet):
                 break
         return str(current_best)
     except Exception as e:
-        print(f"Error finding page: {e}")
+        log.error("Error finding page: %s", e)
         return "?"
 
 def add_question(category, question, options, correct_answer, explanation, image=None):
@@ -2329,12 +2335,33 @@ add_question(
 )
 
 # --- Output ---
-
-output_dir = "question_pool"
-if not os.path.exists(output_dir):
-    os.makedirs(output_dir)
-
-with open(os.path.join(output_dir, "questions.json"), "w", encoding="utf-8") as f:
-    json.dump(questions, f, indent=2)
-
-print(f"Generated {len(questions)} questions.")
+# Only when run as a script, so tools (benchmark.py) can import get_page_number
+
+if __name__ == "__main__":
+    output_dir = "question_pool"
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    # Point out questions that the last item analysis (item_analysis.py) flagged.
+    # Matched on text and options, since IDs shift when questions are added.
+    report_path = os.path.join(output_dir, "item_analysis.json")
+    if os.path.exists(report_path):
+        with open(report_path, encoding="utf-8") as f:
+            report = json.load(f)
+        flagged = {
+            (item["question"], tuple(item["options"])): item
+            for item in report["items"] if item["flags"]
+        }
+        for q in questions:
+            item = flagged.get((q["question"], tuple(q["options"])))
+            if item:
+                log.warning(
+                    "Question %d flagged by item analysis: %s", q["id"], ", ".join(item["flags"]),
+                    extra={"question_id": q["id"], "flags": item["flags"], "p_value": item["p_value"],
+                           "point_biserial": item["point_biserial"]},
+                )
+
+    with open(os.path.join(output_dir, "questions.json"), "w", encoding="utf-8") as f:
+        json.dump(questions, f, indent=2)
+
+    log.info("Generated %d questions.", len(questions), extra={"questions": len(questions)})
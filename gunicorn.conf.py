@@ -0,0 +1,104 @@
+"""
+Gunicorn settings for the web app (picked up automatically from the working dir,
+or explicitly with `gunicorn -c gunicorn.conf.py main:app`).
+
+The app is preloaded in the master so the question pool is parsed and
+QUESTION_MAP built exactly once. Everything alive at that point is moved into
+the permanent GC generation with gc.freeze(), so the collector in the workers
+never touches (and never copies) those pages after fork.
+
+Worker/thread counts are sized from the CPU cores and memory available to the
+container and can be overridden with WEB_CONCURRENCY / GUNICORN_THREADS.
+"""
+import gc
+import os
+import time
+
+# Rough resident size of one worker on top of the shared, preloaded pages
+WORKER_MEMORY_MB = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", "64"))
+
+_BOOT_STARTED = time.monotonic()
+
+def _available_cpus():
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # Respect the cgroup CPU quota (docker --cpus, Render plans)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+def _available_memory_mb():
+    # cgroup v2 limit first, then the host total
+    try:
+        with open("/sys/fs/cgroup/memory.max") as f:
+            limit = f.read().strip()
+        if limit != "max":
+            return int(limit) // (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+def rss_mb():
+    import memory
+    return memory.rss_bytes() / (1024 * 1024)
+
+def _default_workers():
+    workers = 2 * _available_cpus() + 1
+    memory_mb = _available_memory_mb()
+    if memory_mb:
+        # Leave half the memory for the master, page cache and spikes
+        workers = min(workers, max(1, (memory_mb // 2) // WORKER_MEMORY_MB))
+    return workers
+
+bind = "0.0.0.0:" + os.environ.get("PORT", "10000")
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", _default_workers()))
+# A few threads per worker so a slow client or webhook doesn't pin the whole worker
+threads = int(os.environ.get("GUNICORN_THREADS", 2 if _available_cpus() == 1 else 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+def on_starting(server):
+    # Workers share their metrics through files in METRICS_DIR (see metrics.py)
+    import tempfile
+    import metrics
+    directory = os.environ.setdefault(
+        "METRICS_DIR", os.path.join(tempfile.gettempdir(), "alabama-dl-metrics")
+    )
+    metrics.clear_dir(directory)
+
+def when_ready(server):
+    # Runs in the master after the app (and the question pool) has been loaded.
+    # Let warmup finish so workers inherit compiled templates and ready state,
+    # then collect once and freeze so workers inherit a clean, untouched heap.
+    import main
+    if not main.wait_until_ready(timeout=60):
+        server.log.warning("Warmup did not complete: %s", main.WARMUP["error"])
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        "Preloaded app in %.2fs (master RSS %.1f MB, %d objects frozen), starting %d workers x %d threads",
+        time.monotonic() - _BOOT_STARTED, rss_mb(), gc.get_freeze_count(), workers, threads,
+    )
+
+def post_fork(server, worker):
+    # The master's connection to Discord doesn't survive the fork
+    import notifications
+    notifications.warm()
+
+def post_worker_init(worker):
+    worker.log.info("Worker %s ready (RSS %.1f MB)", worker.pid, rss_mb())
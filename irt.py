@@ -0,0 +1,286 @@
+"""
+Item response theory calibration of the question pool.
+
+Fits a 2PL or 3PL model by marginal maximum likelihood (Bock-Aitkin EM):
+
+    P(right | theta) = c + (1 - c) / (1 + exp(-a * (theta - b)))
+
+a is discrimination, b difficulty on the ability scale, c the guessing floor
+(0 for 2PL). Abilities are integrated out over Gauss-Hermite quadrature
+points with a standard normal prior, which also fixes the scale.
+
+The E-step works from the answers themselves (exam, item, right or wrong),
+in chunks of whole exams, and only ever looks at the items a chunk's exams
+answered, so memory follows the number of answers rather than exams x pool
+size. Where those answers fill a good share of the chunk's exams x items
+(a pool of a few hundred questions), the chunk is a small dense matrix and
+the sums are matrix products, which are much faster per cell. Sparser
+chunks (big pools) sum each exam's answers from a table of log-probabilities
+and each item's posteriors with bincount. The M-step takes Fisher scoring
+steps for all items at once. Weak priors on a and c keep rarely-answered
+items finite.
+
+A fit starts from the parameters already in question_pool/irt_params.json
+(when the model matches), so the nightly refit only has to move them as far
+as the new answers require. Ability estimates (EAP, per exam) can be written
+with --abilities.
+
+Usage:
+    uv run irt.py [--model 3pl] [--start 2026-10-01] [--abilities abilities.npz]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import analytics
+import app_logging
+import exam_logic
+import item_analysis
+
+log = logging.getLogger(__name__)
+
+PARAMS_PATH = "question_pool/irt_params.json"
+QUAD_POINTS = 41
+CHUNK_EXAMS = 50_000
+# Chunks with at least this share of their exams x items cells answered use dense matrix products
+DENSE_MIN_FILL = 1 / 16
+
+# Priors: a ~ Normal(1, 1), d ~ Normal(0, 3^2), c ~ Beta(5, 17) (3PL, mean ~0.23 for 4 options)
+A_PRIOR = (1.0, 1.0)
+D_PRIOR_SD = 3.0
+C_PRIOR = (5.0, 17.0)
+A_RANGE = (0.05, 5.0)
+C_RANGE = (0.001, 0.5)
+
+def quadrature(n=QUAD_POINTS):
+    """Points and weights for integrating against a standard normal."""
+    points, weights = np.polynomial.hermite_e.hermegauss(n)
+    return points, weights / weights.sum()
+
+def probability(theta, a, b, c=0.0):
+    """P(right) for every (ability, item) pair: theta (n,), a/b/c (m,) -> (n, m)."""
+    theta = np.asarray(theta, dtype=np.float64)[:, None]
+    return c + (1 - c) / (1 + np.exp(-a * (theta - b)))
+
+def _curves(a, d, c, points):
+    """Item x quadrature-point probabilities, clipped away from 0 and 1."""
+    p = c[:, None] + (1 - c[:, None]) / (1 + np.exp(-(a[:, None] * points + d[:, None])))
+    return np.clip(p, 1e-9, 1 - 1e-9)
+
+def _chunks(responses):
+    """
+    The answers cut into chunks of CHUNK_EXAMS whole exams, each over the
+    items its exams answered, laid out for the E-step (once per fit).
+    """
+    order = np.argsort(responses.row, kind="stable")
+    row, col, correct = responses.row[order], responses.col[order], responses.correct[order] > 0
+    # Exams are numbered 0..n-1 and each has at least one answer
+    counts = np.bincount(row, minlength=responses.n_exams)
+    bounds = np.r_[0, np.cumsum(counts)]
+    chunks = []
+    for first in range(0, responses.n_exams, CHUNK_EXAMS):
+        last = min(first + CHUNK_EXAMS, responses.n_exams)
+        lo, hi = bounds[first], bounds[last]
+        n = counts[first:last]
+        exam = np.repeat(np.arange(last - first), n)
+        items, local = np.unique(col[lo:hi], return_inverse=True)
+        right = correct[lo:hi]
+        chunk = {"items": items}
+        if hi - lo >= DENSE_MIN_FILL * (last - first) * len(items):
+            matrix = np.full((last - first, len(items)), -1, dtype=np.int8)
+            matrix[exam, local] = right
+            chunk["matrix"] = matrix
+        else:
+            # Each exam's answers as rows of the stacked [log q; log p] table, padded with a row of zeros
+            slot = np.arange(hi - lo) - np.repeat(bounds[first:last] - lo, n)
+            rows = np.full((last - first, int(n.max())), 2 * len(items), dtype=np.int32)
+            rows[exam, slot] = local + len(items) * right
+            chunk.update(rows=rows, exam=exam, local=local, right=right)
+        chunks.append(chunk)
+    return chunks
+
+def _e_step(chunks, a, d, c, points, log_weights, abilities=False):
+    """Expected right answers and answers per (item, point), the log-likelihood, and optionally EAPs."""
+    p = _curves(a, d, c, points)
+    # float32 for the per-chunk sums: several times faster, and plenty for sums of 30 terms
+    log_p, log_q = np.log(p).astype(np.float32), np.log1p(-p).astype(np.float32)
+    right = np.zeros_like(p)
+    seen = np.zeros_like(p)
+    loglik = 0.0
+    means, sds = [], []
+    for chunk in chunks:
+        items = chunk["items"]
+        item_p, item_q = log_p[items], log_q[items]
+        if "matrix" in chunk:
+            x1 = (chunk["matrix"] == 1).astype(np.float32)
+            asked = (chunk["matrix"] >= 0).astype(np.float32)
+            log_post = x1 @ (item_p - item_q) + asked @ item_q
+        else:
+            table = np.concatenate([item_q, item_p, np.zeros((1, len(points)), dtype=np.float32)])
+            log_post = table[chunk["rows"]].sum(axis=1)
+        log_post += log_weights.astype(np.float32)
+        top = log_post.max(axis=1, keepdims=True)
+        # Clipped so far-off points come out tiny instead of float32 denormals, which are very slow
+        post = np.exp(np.maximum(log_post - top, -80))
+        total = post.sum(axis=1, keepdims=True, dtype=np.float64)
+        loglik += float((np.log(total) + top).sum())
+        post /= total.astype(np.float32)
+        if "matrix" in chunk:
+            right[items] += x1.T @ post
+            seen[items] += asked.T @ post
+        else:
+            local, answered_right = chunk["local"], chunk["right"]
+            for k, column in enumerate(np.ascontiguousarray(post.T)):
+                answer_post = column[chunk["exam"]]
+                seen[items, k] += np.bincount(local, weights=answer_post, minlength=len(items))
+                right[items, k] += np.bincount(local[answered_right], weights=answer_post[answered_right],
+                                               minlength=len(items))
+        if abilities:
+            mean = post @ points
+            means.append(mean)
+            sds.append(np.sqrt(np.maximum(post @ points ** 2 - mean ** 2, 0)))
+    if abilities:
+        return right, seen, loglik, np.concatenate(means), np.concatenate(sds)
+    return right, seen, loglik
+
+def _m_step(right, seen, a, d, c, points, three_pl, steps=5):
+    """Fisher scoring on every item's expected complete-data log-likelihood at once."""
+    k = 3 if three_pl else 2
+    for _ in range(steps):
+        s = 1 / (1 + np.exp(-(a[:, None] * points + d[:, None])))
+        p = np.clip(c[:, None] + (1 - c[:, None]) * s, 1e-9, 1 - 1e-9)
+        slope = (1 - c[:, None]) * s * (1 - s)
+        # dP/d(a, d, c) per item and point
+        grads = [slope * points, slope, 1 - s][:k]
+        residual = (right - seen * p) / (p * (1 - p))
+        info_weight = seen / (p * (1 - p))
+
+        g = np.stack([(residual * gi).sum(axis=1) for gi in grads], axis=1)
+        info = np.empty((len(a), k, k))
+        for i in range(k):
+            for j in range(i, k):
+                info[:, i, j] = info[:, j, i] = (info_weight * grads[i] * grads[j]).sum(axis=1)
+
+        # Priors
+        g[:, 0] -= (a - A_PRIOR[0]) / A_PRIOR[1] ** 2
+        info[:, 0, 0] += 1 / A_PRIOR[1] ** 2
+        g[:, 1] -= d / D_PRIOR_SD ** 2
+        info[:, 1, 1] += 1 / D_PRIOR_SD ** 2
+        if three_pl:
+            alpha, beta = C_PRIOR
+            g[:, 2] += (alpha - 1) / c - (beta - 1) / (1 - c)
+            info[:, 2, 2] += (alpha - 1) / c ** 2 + (beta - 1) / (1 - c) ** 2
+
+        step = np.linalg.solve(info, g[:, :, None])[:, :, 0]
+        # Don't let one noisy step throw an item far off
+        step = np.clip(step, -1.0, 1.0)
+        a = np.clip(a + step[:, 0], *A_RANGE)
+        d = d + step[:, 1]
+        if three_pl:
+            c = np.clip(c + step[:, 2], *C_RANGE)
+    return a, d, c
+
+def fit(responses, model="2pl", init=None, max_iter=200, tol=1e-3):
+    """
+    Calibrates every pool question. `init` is a params dict from load_params
+    (warm start). Returns (params, abilities) where abilities is
+    {"exam", "theta", "sd"} with one entry per exam.
+    """
+    three_pl = model == "3pl"
+    chunks = _chunks(responses)
+    m = responses.n_questions
+    points, weights = quadrature()
+    log_weights = np.log(weights)
+
+    # Cold start from the p-values; warm start from previous parameters where known
+    seen_any = np.bincount(responses.col, minlength=m)
+    right_any = np.bincount(responses.col, weights=responses.correct, minlength=m)
+    p_value = (right_any + 1) / (seen_any + 2)
+    c = np.full(m, 0.2 if three_pl else 0.0)
+    a = np.ones(m)
+    d = np.log((p_value - c).clip(0.01) / (1 - p_value))
+    warm = 0
+    if init and init.get("model") == model:
+        for j, qid in enumerate(responses.question_ids.tolist()):
+            item = init["items"].get(str(qid))
+            if item:
+                a[j], d[j], c[j] = item["a"], -item["a"] * item["b"], item["c"]
+                warm += 1
+    log.info("Fitting %s: %d exams, %d questions (%d warm-started)", model, responses.n_exams, m, warm)
+
+    for iteration in range(1, max_iter + 1):
+        right, seen, loglik = _e_step(chunks, a, d, c, points, log_weights)
+        new_a, new_d, new_c = _m_step(right, seen, a, d, c, points, three_pl)
+        change = max(np.abs(new_a - a).max(), np.abs(new_d - d).max(), np.abs(new_c - c).max())
+        a, d, c = new_a, new_d, new_c
+        log.debug("EM iteration %d: loglik %.2f, max change %.5f", iteration, loglik, change)
+        if change < tol:
+            break
+    else:
+        log.warning("Stopped after %d iterations without converging (max change %.5f)", iteration, change)
+    _, _, loglik, theta, sd = _e_step(chunks, a, d, c, points, log_weights, abilities=True)
+    log.info("Finished after %d iterations (loglik %.2f)", iteration, loglik)
+
+    params = {
+        "model": model,
+        "fitted": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "exams": responses.n_exams,
+        "answers": len(responses.row),
+        "iterations": iteration,
+        "loglik": round(loglik, 3),
+        "items": {
+            str(qid): {"a": round(float(a[j]), 4), "b": round(float(-d[j] / a[j]), 4), "c": round(float(c[j]), 4),
+                       "answers": int(seen_any[j])}
+            for j, qid in enumerate(responses.question_ids.tolist())
+            if seen_any[j]
+        },
+    }
+    return params, {"exam": responses.exams, "theta": theta, "sd": sd}
+
+def load_params(path=PARAMS_PATH):
+    """The saved calibration, or None if there isn't one."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_params(params, path=PARAMS_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    app_logging.setup()
+    parser = argparse.ArgumentParser(description="Fit IRT item parameters from recorded answers.")
+    parser.add_argument("--model", choices=["2pl", "3pl"], default="2pl")
+    parser.add_argument("--start", help="First date of answers (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date of answers (YYYY-MM-DD)")
+    parser.add_argument("--from-log", action="store_true", help="Read the raw answer log instead of the snapshots")
+    parser.add_argument("--cold", action="store_true", help="Ignore the saved parameters and start from scratch")
+    parser.add_argument("--max-iter", type=int, default=200)
+    parser.add_argument("--pool", default="question_pool/questions.json", help="Question pool")
+    parser.add_argument("--out", default=PARAMS_PATH, help=f"Parameter file (default {PARAMS_PATH})")
+    parser.add_argument("--abilities", help="Also write per-exam abilities (exam, theta, sd) to this .npz file")
+    args = parser.parse_args()
+
+    questions = exam_logic.load_questions(args.pool)
+    if args.from_log:
+        responses = item_analysis.Responses.from_log(questions)
+    else:
+        responses = item_analysis.Responses.from_snapshots(questions, args.start, args.end, analytics.ANALYTICS_DIR)
+    if not responses.n_exams:
+        raise SystemExit("No answers to fit")
+
+    started = time.perf_counter()
+    params, abilities = fit(responses, args.model, None if args.cold else load_params(args.out), args.max_iter)
+    save_params(params, args.out)
+    print(f"Fitted {len(params['items'])} questions from {params['exams']} exams in "
+          f"{params['iterations']} iterations ({time.perf_counter() - started:.1f}s). Written to {args.out}")
+    if args.abilities:
+        np.savez(args.abilities, **abilities)
+        print(f"Abilities written to {args.abilities}")
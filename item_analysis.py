@@ -0,0 +1,231 @@
+"""
+Classical item analysis of the question pool from recorded answers.
+
+For every question:
+  p_value          share of answers that were right (difficulty; high = easy)
+  point_biserial   correlation between getting it right and the rest of the
+                   exam (share right on the other questions answered, so
+                   early-failed exams compare fairly); low or negative means
+                   the question doesn't separate strong from weak takers
+  options          per option: selection rate and the mean rest score of
+                   the takers who chose it
+
+and flags for review:
+  too_easy, too_hard, low_discrimination   p_value / point_biserial thresholds
+  unused_distractor                        a wrong option almost nobody picks
+  possible_wrong_key                       negative discrimination, or a wrong
+                                           option picked more often than the key
+                                           by takers who did better elsewhere
+
+Responses are an exams x questions matrix, held in sparse (coordinate) form
+since each exam sees 30 questions of the pool; every statistic is a
+bincount over answers, so millions of exams take seconds.
+
+The report goes to question_pool/item_analysis.json, which
+generate_questions.py reads to warn about flagged questions.
+
+Usage:
+    uv run item_analysis.py [--start 2026-10-01] [--end 2026-10-31]
+    uv run item_analysis.py --from-log    # read the raw answer log instead of snapshots
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import analytics
+import answer_log
+import exam_logic
+
+REPORT_PATH = "question_pool/item_analysis.json"
+
+# Questions with fewer answers get statistics but no flags
+MIN_ATTEMPTS = 30
+TOO_EASY = 0.95
+TOO_HARD = 0.25
+LOW_DISCRIMINATION = 0.10
+UNUSED_DISTRACTOR = 0.02
+
+class Responses:
+    """
+    The exams x questions response matrix in coordinate form: answer i is
+    exam `row[i]` answering pool question `col[i]` with option `opt[i]`,
+    `correct[i]` 0 or 1. `exams[r]` is the exam key of row r.
+    """
+
+    def __init__(self, questions, exam, q, opt, correct):
+        self.questions = questions
+        self.question_ids = np.array([question["id"] for question in questions])
+        order = np.argsort(self.question_ids)
+        slot = np.searchsorted(self.question_ids[order], q).clip(0, len(order) - 1)
+        known = self.question_ids[order][slot] == q
+
+        self.col = order[slot[known]]
+        self.exams, self.row = np.unique(np.asarray(exam)[known], return_inverse=True)
+        self.row = self.row.ravel()
+        self.opt = np.asarray(opt)[known].astype(np.int64)
+        self.correct = np.asarray(correct)[known].astype(np.float64)
+        self.n_exams = int(self.row.max()) + 1 if len(self.row) else 0
+        self.n_questions = len(questions)
+
+    @classmethod
+    def from_snapshots(cls, questions, start=None, end=None, directory=analytics.ANALYTICS_DIR):
+        answers, _ = analytics.load_events(start, end, directory)
+        return cls(questions, answers["exam"], answers["q"], answers["opt"], answers["ok"])
+
+    @classmethod
+    def from_log(cls, questions, log_dir=None):
+        exam, q, opt, ok = [], [], [], []
+        for e in answer_log.read_events(log_dir):
+            if e["type"] == "answer":
+                exam.append(e["exam"])
+                q.append(e["q"])
+                opt.append(e["opt"])
+                ok.append(e["ok"])
+        return cls(questions, np.array(exam, dtype=object).astype(str), np.array(q), np.array(opt), np.array(ok))
+
+    def dense(self):
+        """The full matrix: 1 right, 0 wrong, -1 not asked."""
+        matrix = np.full((self.n_exams, self.n_questions), -1, dtype=np.int8)
+        matrix[self.row, self.col] = self.correct
+        return matrix
+
+def analyze(responses):
+    """Item statistics as arrays over the pool (NaN where a question has no answers)."""
+    m = responses.n_questions
+    row, col, x = responses.row, responses.col, responses.correct
+
+    # Rest score of the exam each answer belongs to, leaving that answer out
+    answered = np.bincount(row, minlength=responses.n_exams)
+    right = np.bincount(row, weights=x, minlength=responses.n_exams)
+    usable = answered[row] > 1
+    rest = np.where(usable, (right[row] - x) / np.maximum(answered[row] - 1, 1), 0.0)
+
+    def per_question(weights):
+        return np.bincount(col[usable], weights=weights[usable], minlength=m)
+
+    attempts = np.bincount(col, minlength=m)
+    n = per_question(np.ones_like(x))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p_value = np.bincount(col, weights=x, minlength=m) / attempts
+        mean_x = per_question(x) / n
+        mean_rest = per_question(rest) / n
+        cov = per_question(x * rest) / n - mean_x * mean_rest
+        var_rest = per_question(rest * rest) / n - mean_rest ** 2
+        point_biserial = cov / np.sqrt(mean_x * (1 - mean_x) * var_rest)
+
+    width = max(max((len(q["options"]) for q in responses.questions), default=1), int(responses.opt.max(initial=0)) + 1)
+    chosen = responses.opt >= 0
+    # (question, option) pairs flattened to one index so they count in one bincount
+    cell = col * width + responses.opt
+
+    def per_option(mask, weights=None):
+        counts = np.bincount(cell[mask], weights=None if weights is None else weights[mask], minlength=m * width)
+        return counts.reshape(m, width)
+
+    option_counts = per_option(chosen)
+    option_rest = per_option(chosen & usable, rest)
+    option_rest_n = per_option(chosen & usable)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        option_rate = option_counts / attempts[:, None]
+        option_mean_rest = option_rest / option_rest_n
+
+    return {
+        "attempts": attempts,
+        "p_value": p_value,
+        "point_biserial": point_biserial,
+        "option_rate": option_rate,
+        "option_mean_rest": option_mean_rest,
+    }
+
+def _flags(q, attempts, p_value, r_pb, rates, mean_rest):
+    if attempts < MIN_ATTEMPTS:
+        return []
+    flags = []
+    if p_value > TOO_EASY:
+        flags.append("too_easy")
+    if p_value < TOO_HARD:
+        flags.append("too_hard")
+    if not np.isnan(r_pb) and 0 <= r_pb < LOW_DISCRIMINATION:
+        flags.append("low_discrimination")
+
+    key = q["options"].index(q["correct_answer"]) if q["correct_answer"] in q["options"] else None
+    distractors = [i for i in range(len(q["options"])) if i != key]
+    if any(rates[i] < UNUSED_DISTRACTOR for i in distractors):
+        flags.append("unused_distractor")
+    if key is not None:
+        stronger = [
+            i for i in distractors
+            if rates[i] > rates[key] and not np.isnan(mean_rest[i]) and mean_rest[i] > mean_rest[key]
+        ]
+        if (not np.isnan(r_pb) and r_pb < 0) or stronger:
+            flags.append("possible_wrong_key")
+    return flags
+
+def build_report(responses, stats):
+    def number(value, digits=4):
+        return None if np.isnan(value) else round(float(value), digits)
+
+    items = []
+    for j, q in enumerate(responses.questions):
+        rates = stats["option_rate"][j]
+        mean_rest = stats["option_mean_rest"][j]
+        items.append({
+            "id": q["id"],
+            "category": q["category"],
+            "question": q["question"],
+            "options": q["options"],
+            "attempts": int(stats["attempts"][j]),
+            "p_value": number(stats["p_value"][j]),
+            "point_biserial": number(stats["point_biserial"][j]),
+            "option_stats": [
+                {"option": text, "key": text == q["correct_answer"], "rate": number(rates[i]), "mean_rest": number(mean_rest[i])}
+                for i, text in enumerate(q["options"])
+            ],
+            "flags": _flags(q, stats["attempts"][j], stats["p_value"][j], stats["point_biserial"][j], rates, mean_rest),
+        })
+    return {
+        "generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "exams": responses.n_exams,
+        "answers": len(responses.row),
+        "thresholds": {
+            "min_attempts": MIN_ATTEMPTS, "too_easy": TOO_EASY, "too_hard": TOO_HARD,
+            "low_discrimination": LOW_DISCRIMINATION, "unused_distractor": UNUSED_DISTRACTOR,
+        },
+        "items": items,
+    }
+
+def write_report(report, path=REPORT_PATH):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Classical item analysis from recorded answers.")
+    parser.add_argument("--start", help="First date of answers (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Last date of answers (YYYY-MM-DD)")
+    parser.add_argument("--from-log", action="store_true", help="Read the raw answer log instead of the snapshots")
+    parser.add_argument("--pool", default="question_pool/questions.json", help="Question pool")
+    parser.add_argument("--out", default=REPORT_PATH, help=f"Report path (default {REPORT_PATH})")
+    args = parser.parse_args()
+
+    questions = exam_logic.load_questions(args.pool)
+    started = time.perf_counter()
+    if args.from_log:
+        responses = Responses.from_log(questions)
+    else:
+        responses = Responses.from_snapshots(questions, args.start, args.end)
+    loaded = time.perf_counter()
+    report = build_report(responses, analyze(responses))
+    write_report(report, args.out)
+    done = time.perf_counter()
+
+    print(f"{report['answers']} answers from {report['exams']} exams "
+          f"(loaded in {loaded - started:.2f}s, analyzed in {done - loaded:.2f}s)")
+    flagged = [item for item in report["items"] if item["flags"]]
+    for item in flagged:
+        print(f"  #{item['id']} p={item['p_value']} r_pb={item['point_biserial']} {', '.join(item['flags'])}")
+    print(f"{len(flagged)} of {len(report['items'])} questions flagged. Report written to {args.out}")
@@ -0,0 +1,291 @@
+"""
+Concurrent load test for the web app.
+
+Simulates many test-takers at once, each running a full exam
+(/start -> /quiz -> 30 x /answer -> /results) over its own keep-alive
+connection with its own session cookie. Each simulated user answers correctly
+with probability --accuracy; an --early-fail share of them answer everything
+wrong, so they hit the early-fail redirect after 7 answers.
+
+The target is one of:
+  --url http://127.0.0.1:10000   a server that is already running
+  --in-process                   main.app on a threaded dev server in this process
+  --gunicorn                     a local gunicorn started with gunicorn.conf.py
+
+Only ever talks to localhost.
+
+Usage:
+    uv run load_test.py --gunicorn --users 2000 --accuracy 0.85 --early-fail 0.1
+"""
+import argparse
+import asyncio
+import contextlib
+import html
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from urllib.parse import urlencode, urlsplit
+
+OPTION_PATTERN = re.compile(r'name="option" value="([^"]*)"')
+CORRECT_ANSWER_PATTERN = re.compile(r'data-correct-answer="([^"]*)"')
+
+class Connection:
+    """Tiny HTTP/1.1 client: one keep-alive connection plus a cookie jar."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.cookies = {}
+
+    async def request(self, method, path, form=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        body = urlencode(form).encode() if form else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}"]
+        if self.cookies:
+            lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+        if form is not None:
+            lines.append("Content-Type: application/x-www-form-urlencoded")
+        lines.append(f"Content-Length: {len(body)}")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("Server closed the connection")
+        status = int(status_line.split()[1])
+
+        headers = {}
+        while True:
+            line = (await self.reader.readline()).decode("latin-1").rstrip("\r\n")
+            if not line:
+                break
+            name, _, value = line.partition(":")
+            name, value = name.strip().lower(), value.strip()
+            if name == "set-cookie":
+                cookie = value.split(";", 1)[0]
+                key, _, val = cookie.partition("=")
+                self.cookies[key] = val
+            else:
+                headers[name] = value
+
+        if "content-length" in headers:
+            data = await self.reader.readexactly(int(headers["content-length"]))
+        elif headers.get("transfer-encoding") == "chunked":
+            data = b""
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                data += chunk[:-2]
+        else:
+            data = await self.reader.read()
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, headers, data.decode("utf-8", "replace")
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+class Stats:
+    def __init__(self):
+        self.latencies = {}  # route -> [seconds]
+        self.errors = 0
+        self.exams = 0
+        self.outcomes = {"passed": 0, "failed": 0}
+        self.early_fails = 0
+
+    def record(self, route, seconds):
+        self.latencies.setdefault(route, []).append(seconds)
+
+def route_of(path):
+    return urlsplit(path).path
+
+async def timed(conn, stats, method, path, form=None):
+    """Sends one request, following redirects within the app, and records each hop."""
+    while True:
+        started = time.perf_counter()
+        status, headers, body = await conn.request(method, path, form)
+        stats.record(route_of(path), time.perf_counter() - started)
+        if status in (301, 302, 303, 307, 308):
+            path = urlsplit(headers["location"]).path or "/"
+            method, form = "GET", None
+            continue
+        if status >= 400:
+            raise RuntimeError(f"{method} {path} -> {status}")
+        return path, body
+
+def choose_answer(body, accuracy, rng):
+    options = [html.unescape(o) for o in OPTION_PATTERN.findall(body)]
+    if not options:
+        raise RuntimeError("No options found on quiz page")
+    correct = html.unescape(CORRECT_ANSWER_PATTERN.search(body).group(1))
+    wrong = [o for o in options if o != correct]
+    if rng.random() < accuracy or not wrong:
+        return correct
+    return rng.choice(wrong)
+
+async def take_exam(host, port, stats, accuracy, rng):
+    conn = Connection(host, port)
+    answered = 0
+    try:
+        path, body = await timed(conn, stats, "GET", "/start")
+        while route_of(path) == "/quiz":
+            option = choose_answer(body, accuracy, rng)
+            path, body = await timed(conn, stats, "POST", "/answer", {"option": option})
+            answered += 1
+        if route_of(path) != "/results":
+            raise RuntimeError(f"Exam ended on {path}")
+        stats.exams += 1
+        stats.outcomes["passed" if "PASSED" in body else "failed"] += 1
+        if answered < 30:
+            stats.early_fails += 1
+    except Exception:
+        stats.errors += 1
+    finally:
+        await conn.close()
+
+def local_target(url):
+    """(host, port) of `url`, refusing anything but localhost before a single request goes out."""
+    parts = urlsplit(url)
+    if parts.hostname not in ("localhost", "127.0.0.1", "::1"):
+        raise SystemExit("Refusing to load test anything but localhost")
+    return parts.hostname, parts.port or 80
+
+async def run(url, users, concurrency, accuracy=0.85, early_fail=0.0, seed=None):
+    host, port = local_target(url)
+
+    stats = Stats()
+    limit = asyncio.Semaphore(concurrency)
+    rng = random.Random(seed)
+
+    async def one_user(user_accuracy):
+        async with limit:
+            await take_exam(host, port, stats, user_accuracy, rng)
+
+    # Early-failers get everything wrong; everyone else answers at --accuracy
+    plan = [0.0 if rng.random() < early_fail else accuracy for _ in range(users)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_user(a) for a in plan))
+    return stats, time.perf_counter() - started
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+def report(stats, elapsed):
+    total_requests = sum(len(v) for v in stats.latencies.values())
+    print(f"Exams completed: {stats.exams}, errors: {stats.errors}, wall time {elapsed:.2f}s")
+    print(
+        f"Outcomes: {stats.outcomes['passed']} passed, {stats.outcomes['failed']} failed "
+        f"({stats.early_fails} early fails)"
+    )
+    print(f"Throughput: {total_requests / elapsed:.1f} req/s, {stats.exams / elapsed:.1f} exams/s")
+    print(f"{'route':<10} {'count':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, values in sorted(stats.latencies.items()):
+        print(
+            f"{route:<10} {len(values):>8} {statistics.mean(values) * 1000:>9.1f} "
+            f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+            f"{percentile(values, 99) * 1000:>9.1f}"
+        )
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url + "/readyz", timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"Server at {url} did not become ready within {timeout}s")
+
+@contextlib.contextmanager
+def in_process_server():
+    """main.app on werkzeug's threaded server. Shares the GIL with the load generator."""
+    os.environ.setdefault("LOG_LEVELS", "main=WARNING,werkzeug=WARNING")
+    from werkzeug.serving import make_server
+    import main
+
+    port = free_port()
+    server = make_server("127.0.0.1", port, main.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(url)
+        yield url
+    finally:
+        server.shutdown()
+
+@contextlib.contextmanager
+def gunicorn_server(workers=None):
+    """A local gunicorn using the production config, bound to a free localhost port."""
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), LOG_LEVELS="main=WARNING")
+    if workers:
+        env["WEB_CONCURRENCY"] = str(workers)
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-b", f"127.0.0.1:{port}", "main:app"]
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(url)
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent test-takers against a local server.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:10000", help="Already running local server")
+    target.add_argument("--in-process", action="store_true", help="Serve main.app from this process")
+    target.add_argument("--gunicorn", action="store_true", help="Start a local gunicorn")
+    parser.add_argument("--workers", type=int, default=None, help="Gunicorn workers (default: from gunicorn.conf.py)")
+    parser.add_argument("--users", type=int, default=1000, help="Number of simulated test-takers")
+    parser.add_argument("--concurrency", type=int, default=None, help="Max users in flight (default: all)")
+    parser.add_argument("--accuracy", type=float, default=0.85, help="Chance each answer is correct")
+    parser.add_argument("--early-fail", type=float, default=0.0, help="Share of users who answer everything wrong")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible answer choices")
+    args = parser.parse_args()
+
+    if args.in_process:
+        server = in_process_server()
+    elif args.gunicorn:
+        server = gunicorn_server(args.workers)
+    else:
+        local_target(args.url)
+        wait_until_ready(args.url)
+        server = contextlib.nullcontext(args.url)
+
+    with server as url:
+        stats, elapsed = asyncio.run(run(
+            url, args.users, args.concurrency or args.users,
+            accuracy=args.accuracy, early_fail=args.early_fail, seed=args.seed,
+        ))
+    report(stats, elapsed)
@@ -1,26 +1,247 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify
-import requests
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, g
+from flask.sessions import SecureCookieSessionInterface
 import exam_logic
+import admin
+import answer_log
+import app_logging
+import deadlines
+import exam_buffer
+import memory
+import metrics
+import notifications
+import profiling
+import seen
+import study
+import timing
+import user_store
+import weak_areas
+import logging
 import os
 import random
+import secrets
+import threading
+import time
 # from dotenv import load_dotenv
 
 # load_dotenv() # Load environment variables from .env file
 
+app_logging.setup()
+log = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = "super_secret_key_change_this_for_prod"  # Needed for session
 
+# --- Metrics ---
+REQUEST_LATENCY = metrics.Histogram(
+    "http_request_duration_seconds", "Time spent handling a request, session save included.", ["route"]
+)
+REQUESTS = metrics.Counter("http_requests_total", "Requests handled.", ["route", "status"])
+SESSION_COOKIE_BYTES = metrics.Histogram(
+    "session_cookie_bytes", "Size of the signed session cookie sent to the browser.",
+    buckets=(256, 512, 1024, 1536, 2048, 3072, 4096),
+)
+EXAMS_FINISHED = metrics.Counter("exams_finished_total", "Exams that reached the results page, or ran out of time.", ["result"])
+
+class MeteredSessionInterface(SecureCookieSessionInterface):
+    """Cookie sessions as usual, but records how big the cookie got."""
+
+    def open_session(self, app, request):
+        with timing.phase("session-decode"):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with timing.phase("session-encode"):
+            super().save_session(app, session, response)
+        if is_warmup():
+            return
+        cookie_name = self.get_cookie_name(app) + "="
+        for header in response.headers.getlist("Set-Cookie"):
+            if header.startswith(cookie_name):
+                SESSION_COOKIE_BYTES.observe(len(header.split(";", 1)[0]) - len(cookie_name))
+
+app.session_interface = MeteredSessionInterface()
+
+# Server-Timing headers for devtools, off unless SERVER_TIMING=1
+if timing.ENABLED:
+    app.wsgi_app = timing.ServerTimingMiddleware(app.wsgi_app)
+
+# Sampled request profiles, off unless PROFILE_SAMPLE_RATE or ADMIN_TOKEN is set
+if profiling.ENABLED:
+    app.wsgi_app = profiling.ProfilingMiddleware(app.wsgi_app)
+
+# Cold-start state reported by /readyz. Timings are in milliseconds.
+WARMUP = {"ready": False, "error": None, "timings": {}}
+# Set on the warmup's test client only: WSGI environ keys can't come from the network, unlike headers
+WARMUP_ENVIRON = "alabama.warmup"
+
+def is_warmup():
+    """True for the synthetic exam run by warmup(), which stays out of metrics, logs and user state."""
+    return bool(request.environ.get(WARMUP_ENVIRON))
+
 # Load questions once at startup
 try:
+    _started = time.perf_counter()
     ALL_QUESTIONS = exam_logic.load_questions()
+    WARMUP["timings"]["load_pool"] = (time.perf_counter() - _started) * 1000
+
     # Create lookup map for easy access
+    _started = time.perf_counter()
     QUESTION_MAP = {q["id"]: q for q in ALL_QUESTIONS}
-    print(f"Loaded {len(ALL_QUESTIONS)} questions.")
+    WARMUP["timings"]["build_indexes"] = (time.perf_counter() - _started) * 1000
+    log.info("Loaded %d questions.", len(ALL_QUESTIONS), extra={"questions": len(ALL_QUESTIONS)})
 except Exception as e:
-    print(f"Error loading questions: {e}")
+    log.error("Error loading questions: %s", e)
     ALL_QUESTIONS = []
     QUESTION_MAP = {}
 
+# Sympson-Hetter exposure control, shared by the workers through a memory-mapped file (needs NumPy)
+EXPOSURE = None
+try:
+    import exposure
+    if exposure.enabled() and ALL_QUESTIONS:
+        EXPOSURE = exposure.ExposureControl([q["id"] for q in ALL_QUESTIONS])
+except ImportError as e:
+    log.warning("Exposure control disabled: %s", e)
+ADMIT = EXPOSURE.admit if EXPOSURE else None
+
+# Ready-made exams, refilled in the background so /start doesn't pay for generation
+EXAM_BUFFER = exam_buffer.ExamBuffer(ALL_QUESTIONS, admit=ADMIT)
+# Per-category indexes for weak-area exams and for not repeating questions
+WEAK_SAMPLER = weak_areas.WeakAreaSampler(ALL_QUESTIONS)
+UNSEEN_SAMPLER = seen.UnseenSampler(ALL_QUESTIONS)
+# Returning users' next exams, made in the background after each /start
+NEXT_EXAMS = seen.NextExamPrefetcher(UNSEEN_SAMPLER, admit=ADMIT)
+
+metrics.Gauge("question_pool_size", "Questions in the loaded pool.", lambda: len(ALL_QUESTIONS), aggregate="max")
+metrics.Gauge("webhook_queue_depth", "Discord notifications waiting to be sent.", notifications.pending)
+metrics.Gauge("exam_buffer_size", "Pre-generated exams ready to serve.", lambda: EXAM_BUFFER.stats()["buffered"])
+metrics.Gauge("log_records_dropped", "Log records dropped because the sink fell behind.", app_logging.dropped)
+metrics.Gauge("next_exam_pending", "Returning users' next exams waiting to be made.", NEXT_EXAMS.pending)
+metrics.Gauge("answer_log_pending", "Answer events waiting to be written.", answer_log.pending)
+metrics.Gauge("answer_log_dropped", "Answer events dropped because the writer fell behind.", answer_log.dropped)
+metrics.Gauge(
+    "question_exposure_max_rate", "Highest share of recent exams showing any one question.",
+    lambda: EXPOSURE.max_use_rate() if EXPOSURE else 0.0, aggregate="max",
+)
+metrics.Gauge("custom_exams_cached", "Custom exams held in memory.", lambda: len(getattr(app, "custom_exams", {})))
+metrics.Gauge(
+    "process_resident_memory_bytes", "Resident memory of each worker, sampled periodically.",
+    memory.sampled_rss, labelnames=["pid"],
+)
+metrics.Gauge(
+    "process_resident_memory_peak_bytes", "Highest sampled resident memory of each worker.",
+    memory.sampled_peak_rss, labelnames=["pid"],
+)
+
+# Questions turned down by exposure control that an adaptive exam remembers (they ride in the cookie)
+MAX_SKIPPED = 30
+
+# Simulations behind the pass estimate, run inline on the results page (100k take ~20 ms; cost is linear)
+PASS_ESTIMATE_SIMS = int(os.environ.get("PASS_ESTIMATE_SIMS", "100000"))
+
+# Timed exams (/start?timed=1): time for the whole exam, optionally per question (0 = no limit),
+# and slack for answers sent right at the deadline
+EXAM_TIME_LIMIT = int(os.environ.get("EXAM_TIME_LIMIT_S", "1800"))
+QUESTION_TIME_LIMIT = int(os.environ.get("QUESTION_TIME_LIMIT_S", "0"))
+DEADLINE_GRACE = 2
+# Recorded for a question whose time ran out
+TIMED_OUT_ANSWER = "(no answer in time)"
+
+# Adaptive practice engine, built once per process (needs NumPy)
+_adaptive = {"engine": None, "error": None}
+_adaptive_lock = threading.Lock()
+
+def adaptive_engine():
+    """The adaptive practice engine, or None if it can't be built."""
+    if _adaptive["engine"] is None and _adaptive["error"] is None:
+        with _adaptive_lock:
+            if _adaptive["engine"] is None and _adaptive["error"] is None:
+                try:
+                    import adaptive
+                    _adaptive["engine"] = adaptive.load_engine(ALL_QUESTIONS)
+                    log.info("Adaptive engine ready (%d of %d questions calibrated)",
+                             _adaptive["engine"].calibrated, len(ALL_QUESTIONS))
+                except ImportError as e:
+                    _adaptive["error"] = str(e)
+                    log.warning("Adaptive practice disabled: %s", e)
+    return _adaptive["engine"]
+
+def adaptive_answered(exam_ids, answers):
+    """[(question_id, correct), ...] for the questions answered so far, in order."""
+    return [
+        (qid, answers[str(qid)] == QUESTION_MAP[qid]["correct_answer"])
+        for qid in exam_ids if str(qid) in answers and qid in QUESTION_MAP
+    ]
+
+def current_user():
+    """This browser's user ID, kept across exams (the rest of the session is per exam)."""
+    if "user_id" not in session:
+        session["user_id"] = secrets.token_hex(8)
+    return session["user_id"]
+
+def load_deck(user):
+    return study.Deck.unpack(user_store.get(user, "study_deck"))
+
+def save_deck(user, deck):
+    user_store.put(user, "study_deck", deck.pack())
+
+def load_history(user):
+    return weak_areas.unpack(user_store.get(user, "history"))
+
+def time_left(key="deadline"):
+    """Seconds left before the session's "deadline" or "question_deadline", or None if there isn't one."""
+    deadline = session.get(key)
+    return None if deadline is None else deadline - time.time()
+
+# A timed exam whose deadline lives on another worker is finished by whichever side claims
+# "timed:<token>" in the user store first; the other side then deletes the row.
+# Without the store, only results seen on the deadline's own worker cancel it.
+
+def expire_exam(token, user):
+    """Deadline wheel callback: a timed exam ran out. Finished as expired unless its results were seen first."""
+    key = "timed:" + token
+    if not user_store.claim(user, key, b"expired"):
+        user_store.delete(user, key)
+        return
+    EXAMS_FINISHED.inc(result="expired")
+    log.info("Timed exam expired", extra={"exam": token})
+
+def finish_timed(token, user):
+    """Marks a timed exam finished. False if it was already counted as expired."""
+    if deadlines.cancel(token):
+        # The deadline was this worker's and won't fire: nothing to coordinate
+        return True
+    key = "timed:" + token
+    if not user_store.claim(user, key, b"finished"):
+        user_store.delete(user, key)
+        return False
+    return True
+
+deadlines.on_expire(expire_exam)
+metrics.Gauge("timed_exams_pending", "Timed exams waiting on their deadline in this worker.", deadlines.pending)
+
+def category_accuracy(answers):
+    """Per-category share of right answers, smoothed so a few answers don't read as 0% or 100%."""
+    tally = {}
+    for qid, answer in answers.items():
+        q = QUESTION_MAP.get(int(qid)) if qid.isdigit() else None
+        if q is None:
+            continue
+        right, asked = tally.get(q["category"], (0, 0))
+        tally[q["category"]] = (right + (answer == q["correct_answer"]), asked + 1)
+    return {category: (right + 1) / (asked + 2) for category, (right, asked) in tally.items()}
+
+def pass_estimate(answers):
+    """Chance of passing the next exam at this exam's accuracy, or None if it can't be estimated."""
+    accuracy = category_accuracy(answers)
+    if not accuracy:
+        return None
+    try:
+        return exam_logic.estimate_pass_probability(accuracy, n_sims=PASS_ESTIMATE_SIMS)
+    except ImportError:
+        # NumPy is optional for the web app
+        return None
+
 @app.route("/")
 def index():
     return render_template("index.html")
@@ -28,17 +249,55 @@ def index():
 @app.route("/start")
 def start_exam():
     """Initializes a new exam session."""
+    user = session.get("user_id")
     session.clear()
+    if user:
+        session["user_id"] = user
+    # Identifies this exam in logs and answer events
+    session["exam_token"] = secrets.token_hex(8)
+    app_logging.exam_id.set(session["exam_token"])
     
-    # Generate new exam questions
-    current_exam = exam_logic.generate_exam(ALL_QUESTIONS)
-    
+    # Take a pre-generated exam (generated inline if the buffer is empty)
     # Store ONLY IDs in session to keep cookie small
-    session["exam_ids"] = [q["id"] for q in current_exam]
+    mode = request.args.get("mode")
+    engine = adaptive_engine() if mode == "adaptive" else None
+    with timing.phase("exam"):
+        if mode == "weak":
+            # Biased toward what this user tends to miss
+            session["mode"] = "weak"
+            exam = WEAK_SAMPLER.generate_exam(load_history(current_user()), admit=ADMIT)
+            session["exam_ids"] = [q["id"] for q in exam]
+        elif engine:
+            # Adaptive: questions are picked one at a time, as the answers come in
+            session["mode"] = "adaptive"
+            skipped = set()
+            session["exam_ids"] = [engine.next_question([], ADMIT, skipped)]
+            session["skipped"] = list(skipped)[-MAX_SKIPPED:]
+        else:
+            next_exam = NEXT_EXAMS.take(user) if user else None
+            if next_exam:
+                # Returning user: made in the background, questions they haven't answered yet first.
+                # Not a random sample of the pool, so it has a mode (and stays out of the answer log).
+                session["mode"] = "unseen"
+                session["exam_ids"] = next_exam
+            else:
+                session["exam_ids"] = EXAM_BUFFER.pop()
+            if user and not is_warmup():
+                NEXT_EXAMS.request(user, exclude=session["exam_ids"])
     session["current_index"] = 0
     session["score"] = 0
     session["answers"] = {} # question_id: selected_option
     session["incorrect_answers"] = [] # detailed list for review
+    session["asked_at"] = time.time() # for answer latency in the answer log
+    if request.args.get("timed") == "1" and session.get("mode") != "adaptive":
+        # Enforced on every request from the cookie; the wheel finishes exams nobody comes back to
+        session["deadline"] = round(session["asked_at"] + EXAM_TIME_LIMIT, 3)
+        if QUESTION_TIME_LIMIT:
+            session["question_deadline"] = round(session["asked_at"] + QUESTION_TIME_LIMIT, 3)
+        if not is_warmup():
+            deadlines.schedule(session["exam_token"], session["deadline"] + DEADLINE_GRACE, current_user())
+    if EXPOSURE and not is_warmup():
+        EXPOSURE.record(session["exam_ids"], new_exam=True)
     
     return redirect(url_for("quiz"))
 
@@ -67,26 +326,44 @@ def quiz():
             return redirect(url_for("index"))
         exam_ids = session["exam_ids"]
         # Reconstruct list from IDs
-        questions = [QUESTION_MAP.get(qid) for qid in exam_ids if qid in QUESTION_MAP]
+        with timing.phase("lookup"):
+            questions = [QUESTION_MAP.get(qid) for qid in exam_ids if qid in QUESTION_MAP]
 
     idx = session.get("current_index", 0)
     
     if idx >= len(questions):
         return redirect(url_for("results"))
+
+    exam_left = time_left()
+    if exam_left is not None and exam_left < 0:
+        session["timed_out"] = True
+        return redirect(url_for("results"))
         
     question_data = questions[idx]
     
-    return render_template(
-        "quiz.html", 
-        question=question_data, 
-        index=idx + 1, 
-        total=len(questions)
-    )
+    with timing.phase("render"):
+        return render_template(
+            "quiz.html", 
+            question=question_data, 
+            index=idx + 1, 
+            total=exam_logic.EXAM_LENGTH if session.get("mode") == "adaptive" else len(questions),
+            time_left=exam_left,
+            question_time_left=time_left("question_deadline"),
+        )
 
 @app.route("/answer", methods=["POST"])
 def submit_answer():
     """Processes a user answer."""
     selected_option = request.form.get("option")
+    exam_left = time_left()
+    if exam_left is not None and exam_left < -DEADLINE_GRACE:
+        # Too late: the exam is over and this answer doesn't count
+        session["timed_out"] = True
+        return redirect(url_for("results"))
+    question_left = time_left("question_deadline")
+    if question_left is not None and (question_left < -DEADLINE_GRACE or (not selected_option and question_left < 1)):
+        # Out of time for this question (the page posts an empty answer when it runs out): counts as wrong
+        selected_option = TIMED_OUT_ANSWER
     if not selected_option:
         return redirect(url_for("quiz"))
 
@@ -102,7 +379,8 @@ def submit_answer():
     else:
         if "exam_ids" not in session:
             return redirect(url_for("index"))
-        questions = [QUESTION_MAP.get(qid) for qid in session["exam_ids"] if qid in QUESTION_MAP]
+        with timing.phase("lookup"):
+            questions = [QUESTION_MAP.get(qid) for qid in session["exam_ids"] if qid in QUESTION_MAP]
 
     if not questions:
         return redirect(url_for("index"))
@@ -137,14 +415,60 @@ def submit_answer():
 
         session["incorrect_answers"] = incorrect
 
+    is_adaptive = session.get("mode") == "adaptive"
+    if not is_custom and not is_warmup():
+        # Per-user answer history (for weak-area exams) and seen questions
+        with timing.phase("history"):
+            correct = selected_option == current_q["correct_answer"]
+
+            def record(stored):
+                history = weak_areas.unpack(stored.get("history"))
+                weak_areas.record(history, q_id, correct)
+                bits = UNSEEN_SAMPLER.unpack(stored.get("seen"))
+                UNSEEN_SAMPLER.mark(bits, q_id)
+                return {"history": weak_areas.pack(history), "seen": UNSEEN_SAMPLER.pack(bits)}
+
+            # One transaction from read to write, so another tab's answer (or the next-exam thread) isn't lost
+            user_store.update(current_user(), ("history", "seen"), record)
+
+    # Adaptive, weak-area and unseen-first exams aren't a random sample of the pool, so they stay out of the answer log
+    if not is_custom and not session.get("mode") and not is_warmup():
+        now = time.time()
+        options = current_q["options"]
+        answer_log.record_answer(
+            session.get("exam_token"),
+            q_id,
+            options.index(selected_option) if selected_option in options else -1,
+            selected_option == current_q["correct_answer"],
+            int((now - session.get("asked_at", now)) * 1000),
+        )
+        session["asked_at"] = now
+
+    if is_adaptive:
+        # Practice runs the full length: pick the next question from the answers so far
+        with timing.phase("adaptive"):
+            answered = adaptive_answered(session["exam_ids"], session["answers"])
+            # Questions turned down by exposure control stay out (the latest MAX_SKIPPED of them)
+            kept = session.get("skipped", [])
+            skipped = set(kept)
+            next_id = adaptive_engine().next_question(answered, ADMIT, skipped)
+            # Newest last, so the oldest are the first to go
+            session["skipped"] = (kept + [qid for qid in skipped if qid not in kept])[-MAX_SKIPPED:]
+        if next_id is not None:
+            session["exam_ids"].append(next_id)
+            if EXPOSURE and not is_warmup():
+                EXPOSURE.record([next_id])
+        session["current_index"] += 1
+        session.modified = True
+        return redirect(url_for("quiz"))
+
     # Check for early failure
     # Pass rate is 80%. 
     # Max allowed wrong = total - ceil(total * 0.8)
     # e.g. 30 questions -> 24 needed -> 6 wrong allowed -> 7th wrong kills it.
     
     total_q = len(questions)
-    pass_threshold = int(total_q * 0.8)
-    max_wrong = total_q - pass_threshold
+    max_wrong = exam_logic.max_wrong_answers(total_q)
     
     current_wrong = len(session.get("incorrect_answers", []))
     
@@ -154,6 +478,8 @@ def submit_answer():
 
     # Move to next
     session["current_index"] += 1
+    if "question_deadline" in session:
+        session["question_deadline"] = round(time.time() + QUESTION_TIME_LIMIT, 3)
     session.modified = True # Ensure session is saved
     
     return redirect(url_for("quiz"))
@@ -178,53 +504,127 @@ def results():
         return redirect(url_for("index"))
         
     score = session.get("score", 0)
-    passed = score >= (total * 0.8) # 80% pass rate generic
+    passed = score >= (total * exam_logic.PASS_RATE) # 80% pass rate generic
+    exam_left = time_left()
+    if exam_left is not None and exam_left < 0 and not session.get("results_posted"):
+        # Unanswered questions count as wrong
+        session["timed_out"] = True
     
     # Reconstruct full incorrect details
     raw_incorrect = session.get("incorrect_answers", [])
     detailed_incorrect = []
     
-    for item in raw_incorrect:
-        qid = item.get("id")
-        # Try to find question
-        # For custom exams, IDs might be integers or strings, be careful with lookup
-        q_data = questions_map.get(qid)
-        if not q_data and str(qid) in questions_map: # Try string lookup
-             q_data = questions_map.get(str(qid))
-             
-        if q_data:
-            detailed_incorrect.append({
-                "question": q_data["question"],
-                "user_answer": item["user_answer"],
-                "correct_answer": q_data["correct_answer"],
-                "explanation": q_data["explanation"]
-            })
+    with timing.phase("lookup"):
+        for item in raw_incorrect:
+            qid = item.get("id")
+            # Try to find question
+            # For custom exams, IDs might be integers or strings, be careful with lookup
+            q_data = questions_map.get(qid)
+            if not q_data and str(qid) in questions_map: # Try string lookup
+                 q_data = questions_map.get(str(qid))
+                 
+            if q_data:
+                detailed_incorrect.append({
+                    "question": q_data["question"],
+                    "user_answer": item["user_answer"],
+                    "correct_answer": q_data["correct_answer"],
+                    "explanation": q_data["explanation"]
+                })
     
+    # Estimated once per exam so a refresh shows the same number
+    is_adaptive = session.get("mode") == "adaptive"
+    if is_adaptive and "ability" not in session:
+        # From the ability estimate rather than raw accuracy, since the questions were picked for this taker
+        engine = adaptive_engine()
+        with timing.phase("estimate"):
+            theta, sd = engine.estimate(adaptive_answered(session["exam_ids"], session.get("answers", {})))
+            estimate = exam_logic.estimate_pass_probability(engine.category_accuracy(theta), n_sims=PASS_ESTIMATE_SIMS)
+        session["ability"] = [round(theta, 2), round(sd, 2)]
+        session["pass_estimate"] = [round(estimate[k], 3) for k in ("probability", "low", "high")]
+    elif not is_custom and "pass_estimate" not in session:
+        with timing.phase("estimate"):
+            estimate = pass_estimate(session.get("answers", {}))
+        session["pass_estimate"] = estimate and [round(estimate[k], 3) for k in ("probability", "low", "high")]
+
+    if not is_custom and raw_incorrect and not session.get("deck_seeded") and not is_warmup():
+        # Missed questions go into the study deck
+        with timing.phase("study"):
+            user = current_user()
+            deck = load_deck(user)
+            deck.add(item["id"] for item in raw_incorrect)
+            save_deck(user, deck)
+        session["deck_seeded"] = True
+
     # Send Discord Notification (if not already sent)
-    if not session.get("results_posted", False):
-        webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
-        if webhook_url:
-            try:
-                status_emoji = "✅" if passed else "❌"
-                status_text = "PASSED" if passed else "FAILED"
-                payload = {
-                    "content": f"🚗 **Exam Completed**\n"
-                               f"Score: {score}/{total} ({(score/total)*100:.1f}%)\n"
-                               f"Status: {status_emoji} **{status_text}**"
-                }
-                requests.post(webhook_url, json=payload, timeout=5)
-            except Exception as e:
-                print(f"Failed to send Discord notification: {e}")
-        
+    # Queued and posted by a background thread so the response never waits on Discord
+    if is_adaptive:
+        # Practice, not an exam attempt: no announcement or exam metrics
+        session["results_posted"] = True
+    elif not session.get("results_posted", False):
+        notifications.notify_exam_completed(score, total, passed)
+        if "deadline" not in session or is_warmup() \
+                or finish_timed(session["exam_token"], current_user()):
+            EXAMS_FINISHED.inc(result="expired" if session.get("timed_out") else "passed" if passed else "failed")
+        if not is_custom and not session.get("mode") and not is_warmup():
+            # Same exams as the answer events, so every logged finish has its answers
+            answer_log.record_finish(session.get("exam_token"), score, total, passed)
         session["results_posted"] = True
 
-    return render_template(
-        "results.html", 
-        score=score, 
-        total=total, 
-        passed=passed, 
-        incorrect_answers=detailed_incorrect
-    )
+    with timing.phase("render"):
+        return render_template(
+            "results.html", 
+            score=score, 
+            total=total, 
+            passed=passed, 
+            incorrect_answers=detailed_incorrect,
+            pass_estimate=session.get("pass_estimate"),
+            ability=session.get("ability"),
+            mode=session.get("mode") if session.get("mode") != "unseen" else None,
+            timed="deadline" in session,
+            timed_out=session.get("timed_out", False),
+        )
+
+@app.route("/study")
+def study_card():
+    """Next spaced-repetition card due for this user."""
+    user = current_user()
+    with timing.phase("study"):
+        deck = load_deck(user)
+        qid = deck.next_card()
+        # Skip cards for questions no longer in the pool
+        while qid is not None and qid not in QUESTION_MAP:
+            del deck.cards[qid]
+            qid = deck.next_card()
+    if qid is None:
+        session.pop("study_card", None)
+        return render_template("study_done.html", cards=len(deck), reviewed=session.get("study_reviewed", 0))
+
+    session["study_card"] = qid
+    reviewed = session.get("study_reviewed", 0)
+    with timing.phase("render"):
+        return render_template(
+            "quiz.html",
+            question=QUESTION_MAP[qid],
+            index=reviewed + 1,
+            total=reviewed + deck.due_count(),
+            form_action=url_for("study_answer"),
+        )
+
+@app.route("/study/answer", methods=["POST"])
+def study_answer():
+    selected_option = request.form.get("option")
+    qid = session.pop("study_card", None)
+    if not selected_option or qid not in QUESTION_MAP:
+        return redirect(url_for("study_card"))
+
+    user = current_user()
+    with timing.phase("study"):
+        deck = load_deck(user)
+        if qid in deck.cards:
+            deck.review(qid, selected_option == QUESTION_MAP[qid]["correct_answer"])
+            save_deck(user, deck)
+    session["study_reviewed"] = session.get("study_reviewed", 0) + 1
+    return redirect(url_for("study_card"))
 
 @app.after_request
 def add_header(response):
@@ -235,7 +635,160 @@ def add_header(response):
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '-1'
+
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    g.response_status = response.status_code
+
+    if not is_warmup():
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUESTS.inc(route=route, status=response.status_code)
     return response
 
+@app.route("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape target, aggregated over all workers."""
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+    g.request_id = request.headers.get("X-Request-ID") or secrets.token_hex(8)
+    g.log_tokens = (
+        app_logging.request_id.set(g.request_id),
+        app_logging.exam_id.set(session.get("exam_token") or session.get("exam_id")),
+    )
+
+@app.teardown_request
+def record_request_metrics(exc):
+    # Teardown runs after the session cookie has been signed, so that's included
+    started = g.pop("request_started", None)
+    tokens = g.pop("log_tokens", None)
+    if started is None:
+        return
+    try:
+        if is_warmup():
+            return
+        duration = time.perf_counter() - started
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_LATENCY.observe(duration, route=route)
+        log.info(
+            "request",
+            extra={
+                "method": request.method,
+                "route": route,
+                "status": g.get("response_status"),
+                "duration_ms": round(duration * 1000, 3),
+            },
+        )
+        metrics.ensure_flusher()
+        memory.ensure_rss_sampler()
+    finally:
+        if tokens:
+            app_logging.exam_id.reset(tokens[1])
+            app_logging.request_id.reset(tokens[0])
+
+@app.route("/admin/memory", methods=["GET"])
+@admin.admin_required
+def memory_status():
+    """tracemalloc/RSS status of the worker serving this request."""
+    return jsonify(memory.status())
+
+@app.route("/admin/memory/start", methods=["POST"])
+@admin.admin_required
+def memory_start():
+    frames = request.args.get("frames", 1, type=int)
+    return jsonify(memory.start(frames=max(1, min(frames, 50))))
+
+@app.route("/admin/memory/snapshot", methods=["POST"])
+@admin.admin_required
+def memory_snapshot():
+    """Top allocation sites, plus diffs against the previous and first snapshot."""
+    limit = request.args.get("limit", 25, type=int)
+    group_by = request.args.get("group_by", "lineno")
+    if group_by not in ("lineno", "filename", "traceback"):
+        return jsonify(error="group_by must be lineno, filename or traceback"), 400
+    try:
+        return jsonify(memory.snapshot(limit=limit, group_by=group_by))
+    except RuntimeError as e:
+        return jsonify(error=str(e)), 409
+
+@app.route("/admin/memory/stop", methods=["POST"])
+@admin.admin_required
+def memory_stop():
+    return jsonify(memory.stop())
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify(status="ok")
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: only OK once warmup has primed every hot path."""
+    body = {
+        "ready": WARMUP["ready"],
+        "questions": len(ALL_QUESTIONS),
+        "warmup_ms": {name: round(ms, 2) for name, ms in WARMUP["timings"].items()},
+    }
+    if notifications.warm_seconds is not None:
+        body["warmup_ms"]["discord_connect"] = round(notifications.warm_seconds * 1000, 2)
+    if WARMUP["error"]:
+        body["error"] = WARMUP["error"]
+    return jsonify(body), 200 if WARMUP["ready"] else 503
+
+def warmup():
+    """
+    Pays the cold-start costs up front instead of on the first user's click:
+    compiles every template and runs one synthetic exam end to end through the
+    real routes. Pool loading and index building already happened at import.
+    """
+    timings = WARMUP["timings"]
+    try:
+        if not ALL_QUESTIONS:
+            raise RuntimeError("Question pool is empty")
+
+        started = time.perf_counter()
+        for name in app.jinja_env.list_templates():
+            app.jinja_env.get_template(name)
+        timings["compile_templates"] = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with app.test_client() as client:
+            # Tagged so the synthetic exam stays out of the metrics
+            client.environ_base[WARMUP_ENVIRON] = True
+            client.get("/start")
+            with client.session_transaction() as sess:
+                exam_ids = sess["exam_ids"]
+                sess["results_posted"] = True # Don't announce the synthetic exam on Discord
+            client.get("/quiz")
+            for qid in exam_ids:
+                client.post("/answer", data={"option": QUESTION_MAP[qid]["correct_answer"]})
+            client.get("/results")
+        timings["synthetic_exam"] = (time.perf_counter() - started) * 1000
+
+        # Information tables for adaptive practice (built before gunicorn forks, with --preload)
+        started = time.perf_counter()
+        adaptive_engine()
+        timings["adaptive_engine"] = (time.perf_counter() - started) * 1000
+
+        # Opens the TLS connection to Discord in the background
+        notifications.warm()
+
+        timings["total"] = sum(v for k, v in timings.items() if k != "total")
+        WARMUP["ready"] = True
+        log.info("Warmup finished in %.1f ms", timings["total"], extra={"warmup_ms": timings})
+    except Exception as e:
+        WARMUP["error"] = str(e)
+        log.exception("Warmup failed: %s", e)
+
+_warmup_thread = threading.Thread(target=warmup, name="warmup", daemon=True)
+_warmup_thread.start()
+
+def wait_until_ready(timeout=None):
+    """Blocks until warmup is done. Returns whether the app is ready."""
+    _warmup_thread.join(timeout)
+    return WARMUP["ready"]
+
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0", port=5000)
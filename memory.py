@@ -0,0 +1,154 @@
+"""
+Memory diagnostics: tracemalloc snapshots on demand and periodic RSS samples.
+
+tracemalloc state is per process, so the /admin/memory endpoints act on
+whichever worker serves the request; the pid is included in every response.
+RSS is sampled by a background thread in every worker and exported through
+metrics as process_resident_memory_bytes{pid=...}.
+"""
+import os
+import threading
+import time
+import tracemalloc
+
+# Seconds between RSS samples
+RSS_SAMPLE_INTERVAL = float(os.environ.get("RSS_SAMPLE_INTERVAL", "15"))
+
+_snapshots = {"baseline": None, "latest": None}
+_lock = threading.Lock()
+
+def rss_bytes(pid="self"):
+    """Resident set size of a process (Linux only, 0 elsewhere)."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+def process_started(pid="self"):
+    """
+    When a process started, in epoch seconds, or None if there's no such
+    process. Tells a live pid from a reused one (pids start over in a new
+    container). Linux only; elsewhere any live pid gives 0.0.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the command name, which may itself hold spaces; starttime is the 22nd
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot = next(int(line.split()[1]) for line in f if line.startswith("btime "))
+        return boot + ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError, StopIteration):
+        pass
+    if pid == "self":
+        return 0.0
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        pass
+    return 0.0
+
+# --- tracemalloc ---
+
+def _format_stats(stats, limit):
+    rows = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        row = {
+            "site": f"{frame.filename}:{frame.lineno}",
+            "size_bytes": stat.size,
+            "count": stat.count,
+        }
+        if hasattr(stat, "size_diff"):
+            row["size_diff_bytes"] = stat.size_diff
+            row["count_diff"] = stat.count_diff
+        rows.append(row)
+    return rows
+
+def status():
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "pid": os.getpid(),
+        "tracing": tracemalloc.is_tracing(),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "rss_bytes": rss_bytes(),
+        "has_baseline": _snapshots["baseline"] is not None,
+    }
+
+def start(frames=1):
+    """Starts tracing. More frames give better attribution but cost more memory."""
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        _snapshots["baseline"] = _snapshots["latest"] = None
+    return status()
+
+def stop():
+    with _lock:
+        tracemalloc.stop()
+        _snapshots["baseline"] = _snapshots["latest"] = None
+    return status()
+
+def snapshot(limit=25, group_by="lineno"):
+    """
+    Takes a snapshot and returns the top allocation sites, plus the diff
+    against the previous snapshot (and the first one taken after start).
+    """
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running, start it first")
+
+    with _lock:
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        previous, baseline = _snapshots["latest"], _snapshots["baseline"]
+        _snapshots["latest"] = snap
+        if baseline is None:
+            _snapshots["baseline"] = snap
+
+    result = status()
+    result["top"] = _format_stats(snap.statistics(group_by), limit)
+    if previous is not None:
+        result["diff_previous"] = _format_stats(snap.compare_to(previous, group_by), limit)
+    if baseline is not None:
+        result["diff_baseline"] = _format_stats(snap.compare_to(baseline, group_by), limit)
+    return result
+
+# --- RSS sampling ---
+
+_rss = {"current": 0, "peak": 0}
+_sampler_pid = None
+_sampler_lock = threading.Lock()
+
+def _sample_forever():
+    while True:
+        value = rss_bytes()
+        _rss["current"] = value
+        _rss["peak"] = max(_rss["peak"], value)
+        time.sleep(RSS_SAMPLE_INTERVAL)
+
+def ensure_rss_sampler():
+    """Starts this process's RSS sampler (again after a fork). Cheap to call per request."""
+    global _sampler_pid
+    if _sampler_pid == os.getpid():
+        return
+    with _sampler_lock:
+        if _sampler_pid == os.getpid():
+            return
+        _sampler_pid = os.getpid()
+        _rss["current"] = _rss["peak"] = rss_bytes()
+        threading.Thread(target=_sample_forever, name="rss-sampler", daemon=True).start()
+
+def sampled_rss():
+    """{(pid,): bytes} for the metrics gauge."""
+    return {(os.getpid(),): _rss["current"]}
+
+def sampled_peak_rss():
+    return {(os.getpid(),): _rss["peak"]}
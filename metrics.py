@@ -0,0 +1,266 @@
+"""
+Minimal Prometheus-style metrics.
+
+Counters and fixed-bucket histograms keep one shard per thread, so recording a
+value never takes a lock; shards are only merged when /metrics is scraped.
+
+With several gunicorn workers, each process periodically dumps its values to
+METRICS_DIR/metrics-<pid>.json and the scrape merges every file, so whichever
+worker answers /metrics reports totals for the whole server. Without
+METRICS_DIR the numbers are for the current process only.
+"""
+import bisect
+import glob
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+# Seconds between dumps of this process's values to METRICS_DIR
+FLUSH_INTERVAL = 1.0
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        with _registry_lock:
+            _registry[name] = self
+
+    def _shard(self):
+        # Each thread writes to its own dict; registering it is the only locked step
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def reset(self):
+        """Drops recorded values (after a fork the parent's numbers aren't ours)."""
+        with self._shards_lock:
+            for shard in self._shards:
+                shard.clear()
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self):
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in dict(shard).items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, the +Inf bucket, then the sum
+            state = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def collect(self):
+        totals = {}
+        for shard in list(self._shards):
+            for key, state in dict(shard).items():
+                total = totals.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, value in enumerate(state):
+                    total[i] += value
+        return totals
+
+class Gauge(_Metric):
+    """
+    Value read from a callback at scrape time. `aggregate` merges workers: sum or max.
+    With labelnames, the callback returns {label_values_tuple: value}.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, help_text, callback, aggregate="sum", labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self.callback = callback
+        self.aggregate = aggregate
+
+    def collect(self):
+        if self.labelnames:
+            return {tuple(str(v) for v in key): value for key, value in self.callback().items()}
+        return {(): self.callback()}
+
+def _snapshot():
+    """This process's values as plain JSON-friendly data."""
+    snapshot = {}
+    for name, metric in list(_registry.items()):
+        try:
+            values = metric.collect()
+        except Exception:
+            continue
+        snapshot[name] = [[list(key), value] for key, value in values.items()]
+    return snapshot
+
+_flusher = None
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+def _after_fork():
+    # A forked worker starts from zero instead of double counting the parent
+    for metric in list(_registry.values()):
+        metric.reset()
+
+os.register_at_fork(after_in_child=_after_fork)
+
+def _metrics_dir():
+    return os.environ.get("METRICS_DIR")
+
+def flush():
+    """Dumps this process's values to METRICS_DIR/metrics-<pid>.json."""
+    directory = _metrics_dir()
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(_snapshot(), f)
+    os.replace(tmp_path, os.path.join(directory, f"metrics-{os.getpid()}.json"))
+
+def _flush_forever():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError as e:
+            log.warning("Failed to write metrics: %s", e)
+
+def ensure_flusher():
+    """Starts this process's background flusher if METRICS_DIR is set. Cheap to call per request."""
+    global _flusher, _flusher_pid
+    if _flusher_pid == os.getpid() or not _metrics_dir():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher = threading.Thread(target=_flush_forever, name="metrics-flusher", daemon=True)
+        _flusher_pid = os.getpid()
+        _flusher.start()
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _merge(into, metric, values, alive=True):
+    for key, value in values:
+        key = tuple(key)
+        if metric.kind == "gauge":
+            if not alive:
+                continue # A dead worker's queue depth etc. no longer exists
+            if key in into:
+                into[key] = max(into[key], value) if metric.aggregate == "max" else into[key] + value
+            else:
+                into[key] = value
+        elif metric.kind == "histogram":
+            current = into.get(key)
+            into[key] = list(value) if current is None else [a + b for a, b in zip(current, value)]
+        else:
+            into[key] = into.get(key, 0) + value
+
+def collect_all():
+    """Merged values of every process: {name: {label_key: value}}."""
+    merged = {name: {} for name in _registry}
+    own = _snapshot()
+    for name, values in own.items():
+        _merge(merged[name], _registry[name], values)
+
+    directory = _metrics_dir()
+    if directory:
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            if pid == os.getpid():
+                continue
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _pid_alive(pid)
+            for name, values in snapshot.items():
+                if name in _registry:
+                    _merge(merged[name], _registry[name], values, alive)
+    return merged
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames, key, extra=()):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, values in sorted(collect_all().items()):
+        metric = _registry[name]
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(values.items()):
+            if metric.kind == "histogram":
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (float("inf"),), value[:-1]):
+                    cumulative += count
+                    le = (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {cumulative}")
+            else:
+                lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+def clear_dir(directory):
+    """Removes dumps left behind by a previous server run."""
+    for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,104 @@
+"""
+Discord notifications sent from a background thread.
+
+Request handlers only put a message on a queue; a single daemon thread per
+process does the HTTP work over a keep-alive session. A slow or unreachable
+webhook can therefore never hold up a gunicorn worker or the ASGI server.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+
+import requests
+
+log = logging.getLogger(__name__)
+
+# Drop notifications instead of growing without bound if Discord is down
+MAX_PENDING = 1000
+
+_queue = queue.Queue(maxsize=MAX_PENDING)
+_worker = None
+_worker_pid = None
+_lock = threading.Lock()
+
+def _ensure_worker():
+    """Starts the sender thread (again after a fork, threads don't survive it)."""
+    global _worker, _worker_pid, _queue
+    if _worker is not None and _worker_pid == os.getpid() and _worker.is_alive():
+        return
+    with _lock:
+        if _worker is not None and _worker_pid == os.getpid() and _worker.is_alive():
+            return
+        if _worker_pid is not None and _worker_pid != os.getpid():
+            # Forked: the parent's queue may have been mid-operation, start clean
+            _queue = queue.Queue(maxsize=MAX_PENDING)
+        _worker = threading.Thread(target=_run, name="discord-notifier", daemon=True)
+        _worker_pid = os.getpid()
+        _worker.start()
+
+# Seconds the warm-up request to Discord took in this process (None until done)
+warm_seconds = None
+
+def _run():
+    global warm_seconds
+    http = requests.Session()
+    while True:
+        webhook_url, payload = _queue.get()
+        try:
+            if payload is None:
+                # Warm-up: GET on a webhook returns its metadata without posting,
+                # but leaves a TLS connection open in the session's pool
+                started = time.perf_counter()
+                http.get(webhook_url, timeout=5)
+                warm_seconds = time.perf_counter() - started
+            else:
+                http.post(webhook_url, json=payload, timeout=5)
+        except Exception as e:
+            log.warning("Failed to send Discord notification: %s", e)
+        finally:
+            _queue.task_done()
+
+def pending():
+    """Number of notifications waiting to be sent."""
+    return _queue.qsize()
+
+def send_discord(payload):
+    """Queues a webhook post. Returns False if no webhook is configured or the queue is full."""
+    webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
+    if not webhook_url:
+        return False
+
+    _ensure_worker()
+    try:
+        _queue.put_nowait((webhook_url, payload))
+    except queue.Full:
+        log.warning("Discord notification queue full, dropping message")
+        return False
+    return True
+
+def warm():
+    """Opens the connection to Discord ahead of the first real notification."""
+    webhook_url = os.environ.get("DISCORD_WEBHOOK_URL")
+    if not webhook_url:
+        return False
+
+    _ensure_worker()
+    try:
+        _queue.put_nowait((webhook_url, None))
+    except queue.Full:
+        return False
+    return True
+
+def notify_exam_completed(score, total, passed):
+    if not os.environ.get("DISCORD_WEBHOOK_URL"):
+        return False
+    status_emoji = "✅" if passed else "❌"
+    status_text = "PASSED" if passed else "FAILED"
+    payload = {
+        "content": f"🚗 **Exam Completed**\n"
+                   f"Score: {score}/{total} ({(score/total)*100 if total else 0:.1f}%)\n"
+                   f"Status: {status_emoji} **{status_text}**"
+    }
+    return send_discord(payload)
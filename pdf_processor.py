@@ -1,11 +1,14 @@
 import os
 import json
+import logging
 import time
 import typing
 import pypdf
 from google import genai
 from pydantic import BaseModel
 
+log = logging.getLogger(__name__)
+
 class Question(BaseModel):
     category: str
     question: str
@@ -25,7 +28,7 @@ def extract_text_from_pdf(stream) -> str:
             text += page.extract_text() + "\n"
         return text
     except Exception as e:
-        print(f"Error extracting PDF text: {e}")
+        log.error("Error extracting PDF text: %s", e)
         return ""
 
 def generate_quiz_from_text(text: str) -> list[dict]:
@@ -48,7 +51,7 @@ def generate_quiz_from_text(text: str) -> list[dict]:
     batches = target_count // batch_size
     
     for i in range(batches):
-        print(f"Generating batch {i+1}/{batches}...")
+        log.info("Generating batch %d/%d...", i + 1, batches, extra={"batch": i + 1, "batches": batches})
         prompt = f"""
         You are an expert exam creator. based on the following text, create {batch_size} UNIQUE multiple-choice questions.
         This is batch {i+1} of {batches}. Ensure these questions cover different parts of the text if possible.
@@ -59,6 +62,7 @@ def generate_quiz_from_text(text: str) -> list[dict]:
         retry_delay = 60
         
         for attempt in range(max_retries):
+            batch_started = time.perf_counter()
             try:
                 # Use structured generation with Pydantic model
                 response = client.models.generate_content(
@@ -73,7 +77,7 @@ def generate_quiz_from_text(text: str) -> list[dict]:
                 # Parse response
                 batch_data = response.parsed
                 if not batch_data or not batch_data.questions:
-                    print(f"Empty batch received in batch {i+1}")
+                    log.warning("Empty batch received in batch %d", i + 1, extra={"batch": i + 1})
                     raise ValueError("Empty response")
 
                 # Convert Pydantic models to dicts
@@ -81,16 +85,20 @@ def generate_quiz_from_text(text: str) -> list[dict]:
                 
                 # Add to total
                 all_questions.extend(batch_questions)
+                log.info(
+                    "Batch %d done", i + 1,
+                    extra={"batch": i + 1, "questions": len(batch_questions), "duration_ms": round((time.perf_counter() - batch_started) * 1000, 1)},
+                )
                 
                 # Success, break retry loop but sleep before next batch
                 time.sleep(5) 
                 break
                 
             except Exception as e:
-                print(f"Error in batch {i+1} attempt {attempt+1}: {e}")
+                log.warning("Error in batch %d attempt %d: %s", i + 1, attempt + 1, e, extra={"batch": i + 1, "attempt": attempt + 1})
                 if "429" in str(e) or "quota" in str(e).lower() or "resource_exhausted" in str(e).lower():
                     sleep_time = retry_delay * (2 ** attempt)
-                    print(f"Rate limit hit. Sleeping for {sleep_time}s...")
+                    log.warning("Rate limit hit. Sleeping for %ss...", sleep_time, extra={"sleep_s": sleep_time})
                     time.sleep(sleep_time)
                 else:
                     # Non-retriable error (or we decide not to retry)
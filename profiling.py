@@ -0,0 +1,142 @@
+"""
+Built-in request profiler for production.
+
+Enable with either:
+  PROFILE_SAMPLE_RATE=N    profile one request in N
+  X-Profile: 1 header      profile this request (needs a valid X-Admin-Token)
+
+For every profiled request these files land in PROFILE_DIR:
+  <time>-<pid>-<route>.prof       cProfile stats (python -m pstats, snakeviz)
+  <time>-<pid>-<route>.collapsed  stack samples in collapsed format, ready for
+                                  flamegraph.pl or speedscope (concatenate
+                                  several files to merge them)
+
+Only one request per process is profiled at a time, and the directory is
+pruned (oldest first) to PROFILE_MAX_FILES files / PROFILE_MAX_MB megabytes.
+"""
+import cProfile
+import itertools
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+
+import admin
+
+log = logging.getLogger(__name__)
+
+SAMPLE_RATE = int(os.environ.get("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "alabama-dl-profiles"))
+MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", "200"))
+MAX_BYTES = int(os.environ.get("PROFILE_MAX_MB", "50")) * 1024 * 1024
+# Seconds between stack samples. Requests here take ~1 ms, so a single
+# profile holds few samples; concatenate many .collapsed files for a flame graph.
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", "0.2")) / 1000
+
+# Installed when sampling is on, or when admins could ask for it per request
+ENABLED = SAMPLE_RATE > 0 or bool(os.environ.get("ADMIN_TOKEN"))
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer. Collapsed output: 'a;b;c count'."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.counts.items())
+
+def _prune(directory):
+    """Deletes the oldest profiles until the directory is within its limits."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    while entries and (len(entries) > MAX_FILES or total > MAX_BYTES):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total -= size
+
+class ProfilingMiddleware:
+    """WSGI middleware that profiles sampled or admin-requested requests."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._counter = itertools.count(1)
+        self._busy = threading.Lock()
+
+    def _wanted(self, environ):
+        if environ.get("HTTP_X_PROFILE") and admin.is_admin_token(environ.get(admin.ENVIRON_KEY)):
+            return True
+        return SAMPLE_RATE > 0 and next(self._counter) % SAMPLE_RATE == 0
+
+    def __call__(self, environ, start_response):
+        if not self._wanted(environ) or not self._busy.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        try:
+            profiler = cProfile.Profile()
+            sampler = StackSampler(threading.get_ident())
+            sampler.start()
+            profiler.enable()
+            try:
+                # Consume the body inside the profile, that's where templates may stream
+                result = self.wsgi_app(environ, start_response)
+                try:
+                    body = list(result)
+                finally:
+                    if hasattr(result, "close"):
+                        result.close()
+            finally:
+                profiler.disable()
+                sampler.stop()
+            self._save(environ, profiler, sampler)
+            return body
+        finally:
+            self._busy.release()
+
+    def _save(self, environ, profiler, sampler):
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            route = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "/")).strip("_") or "index"
+            now = time.time()
+            stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f".{int(now * 1000) % 1000:03d}"
+            stem = os.path.join(PROFILE_DIR, f"{stamp}-{os.getpid()}-{route}")
+            profiler.dump_stats(stem + ".prof")
+            if sampler.counts:
+                with open(stem + ".collapsed", "w") as f:
+                    f.write(sampler.collapsed())
+            _prune(PROFILE_DIR)
+        except OSError as e:
+            log.warning("Failed to write profile: %s", e)
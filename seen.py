@@ -0,0 +1,207 @@
+"""
+Per-user record of which pool questions have been seen, so a returning user
+gets questions they haven't had yet.
+
+One bit per question, per category (bit i = the category's i-th question by
+ID), held as Python ints so "how many seen" is a popcount. That's 21 bytes
+for the current pool and never grows with the number of exams taken. The
+packed form starts with a fingerprint of the pool's IDs; after the pool
+changes, old bitsets no longer line up and simply start over.
+
+`UnseenSampler.generate_exam` keeps generate_exam's category split and
+prefers unseen questions in each category. Once a category has fewer unseen
+questions than the exam needs, it takes all of them, clears that category's
+bits and fills the rest from the whole category.
+
+`NextExamPrefetcher` does that off the request path: each /start asks for
+the user's following exam to be made in the background and kept in the user
+store, so /start itself only reads one ready-made exam.
+"""
+import logging
+import os
+import queue
+import random
+import struct
+import threading
+import zlib
+
+import exam_logic
+import user_store
+
+log = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<IH")   # pool fingerprint, number of categories
+
+class UnseenSampler:
+    """Built once per pool: per-category members in ID order, and each ID's slot."""
+
+    def __init__(self, questions):
+        self.categories = list(exam_logic.CATEGORY_RANGES)
+        self.members = {c: sorted((q for q in questions if q["category"] == c), key=lambda q: q["id"]) for c in self.categories}
+        self.slot_of = {q["id"]: (c, i) for c, members in self.members.items() for i, q in enumerate(members)}
+        ids = b"".join(struct.pack("<I", q["id"]) for c in self.categories for q in self.members[c])
+        self.fingerprint = zlib.crc32(ids)
+        self.splits = exam_logic.valid_category_counts()
+
+    def empty(self):
+        return {c: 0 for c in self.categories}
+
+    def unpack(self, data):
+        """Seen bits from the user store, or nothing seen if missing or from another pool."""
+        if not data or len(data) < _HEADER.size:
+            return self.empty()
+        fingerprint, n = _HEADER.unpack_from(data)
+        if fingerprint != self.fingerprint or n != len(self.categories):
+            return self.empty()
+        bits, offset = {}, _HEADER.size
+        for c in self.categories:
+            size = (len(self.members[c]) + 7) // 8
+            bits[c] = int.from_bytes(data[offset:offset + size], "little")
+            offset += size
+        return bits
+
+    def pack(self, bits):
+        parts = [_HEADER.pack(self.fingerprint, len(self.categories))]
+        for c in self.categories:
+            parts.append(bits[c].to_bytes((len(self.members[c]) + 7) // 8, "little"))
+        return b"".join(parts)
+
+    def mark(self, bits, question_id):
+        """Records a question as seen (in place). Unknown IDs are ignored."""
+        slot = self.slot_of.get(question_id)
+        if slot:
+            bits[slot[0]] |= 1 << slot[1]
+
+    def _unseen(self, bits, c):
+        n = len(self.members[c])
+        # Zero bits of the mask, lowest first
+        flags = bin(bits[c] | 1 << n)[:2:-1]
+        return [i for i, flag in enumerate(flags) if flag == "0"]
+
+    def _pick(self, bits, c, k, rng, admit):
+        members = self.members[c]
+        n = len(members)
+        k = min(k, n)
+        unseen = n - bits[c].bit_count()
+        if unseen < k:
+            # Category exhausted: all that's left, then start the category over
+            free = self._unseen(bits, c)
+            chosen = [members[i] for i in free]
+            taken = set(free)
+            rest = [members[i] for i in range(n) if i not in taken]
+            chosen += exam_logic.sample_admitted(rest, k - len(chosen), admit, rng)
+            bits[c] = 0
+            return chosen
+        if unseen * 4 >= n:
+            # Plenty unseen: rejection sampling beats listing the free slots
+            chosen, picked, rejected = [], set(), []
+            for _ in range(50 * k):
+                if len(chosen) == k:
+                    break
+                i = rng.randrange(n)
+                if i in picked or bits[c] >> i & 1:
+                    continue
+                picked.add(i)
+                (chosen if admit is None or admit(members[i]["id"]) else rejected).append(members[i])
+            return chosen + rejected[:k - len(chosen)]
+        return exam_logic.sample_admitted([members[i] for i in self._unseen(bits, c)], k, admit, rng)
+
+    def generate_exam(self, bits, rng=random, admit=None):
+        """
+        A 30-question exam preferring questions not yet in `bits`. Categories
+        that run out are reset in `bits`; the caller marks the questions as
+        they're answered. `admit` is an optional exposure-control lottery.
+        """
+        split = rng.choice(self.splits)
+        exam = []
+        for c, k in split.items():
+            exam.extend(self._pick(bits, c, k, rng, admit))
+        rng.shuffle(exam)
+        return exam
+
+class NextExamPrefetcher:
+    """
+    One background thread per process making returning users' next exams.
+    The exam waits in the user store under "next_exam" until `take`.
+    """
+
+    # Drop requests rather than queue without bound; the user just gets a buffered exam
+    MAX_PENDING = 1000
+
+    def __init__(self, sampler, admit=None):
+        self.sampler = sampler
+        self.admit = admit
+        self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def _ensure_worker(self):
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is not None and self._pid != os.getpid():
+                # Forked: the parent's requests are the parent's
+                self._queue = queue.Queue(maxsize=self.MAX_PENDING)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="next-exam", daemon=True)
+            self._thread.start()
+
+    def request(self, user, exclude=()):
+        """
+        Asks for `user`'s next exam, avoiding `exclude` (the exam they're
+        starting now, not yet marked seen). Never blocks.
+        """
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((user, list(exclude)))
+        except queue.Full:
+            pass
+
+    def take(self, user):
+        """The exam made for `user`, as question IDs, or None."""
+        data = user_store.get(user, "next_exam")
+        if not data:
+            return None
+        return list(struct.unpack(f"<{len(data) // 4}I", data))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            user, exclude = self._queue.get()
+            try:
+                self.prefetch(user, exclude)
+            except Exception:
+                log.exception("Next exam for %s failed", user)
+
+    def prefetch(self, user, exclude=()):
+        seen_data = user_store.get(user, "seen")
+        if not seen_data:
+            # Nothing answered yet: any exam is an unseen one
+            user_store.delete(user, "next_exam")
+            return
+        bits = self.sampler.unpack(seen_data)
+        working = dict(bits)
+        for qid in exclude:
+            self.sampler.mark(working, qid)
+        before = dict(working)
+        exam = [q["id"] for q in self.sampler.generate_exam(working, admit=self.admit)]
+        reset = [c for c in working if before[c] and not working[c]]
+        next_exam = struct.pack(f"<{len(exam)}I", *exam)
+
+        def start_over(stored):
+            # Against what's stored now: /answer may have marked questions since the read above.
+            # Those marks stay; only the bits this exam used up are cleared.
+            if not reset:
+                return {"next_exam": next_exam}
+            current = self.sampler.unpack(stored.get("seen"))
+            for c in reset:
+                current[c] &= ~bits[c]
+            return {"next_exam": next_exam, "seen": self.sampler.pack(current)}
+
+        # Categories that ran out start over (the excluded exam's questions get marked as they're answered)
+        user_store.update(user, ("seen",) if reset else (), start_over)
@@ -0,0 +1,222 @@
+// Client-side exam engine used by the static export (export_static.py).
+// Mirrors exam_logic.generate_exam and the early-fail rule in main.submit_answer,
+// keeping the exam state in sessionStorage instead of the Flask session.
+(function () {
+    const STATE_KEY = 'exam_state';
+    const DATA_URL = new URL('../../data/', document.currentScript.src);
+
+    function randint(a, b) {
+        // Inclusive on both ends, like Python's random.randint
+        return a + Math.floor(Math.random() * (b - a + 1));
+    }
+
+    function sample(items, k) {
+        // Partial Fisher-Yates, like random.sample
+        const pool = items.slice();
+        const n = Math.min(k, pool.length);
+        for (let i = 0; i < n; i++) {
+            const j = randint(i, pool.length - 1);
+            [pool[i], pool[j]] = [pool[j], pool[i]];
+        }
+        return pool.slice(0, n);
+    }
+
+    function shuffle(items) {
+        for (let i = items.length - 1; i > 0; i--) {
+            const j = randint(0, i);
+            [items[i], items[j]] = [items[j], items[i]];
+        }
+        return items;
+    }
+
+    function generateExam(manifest, pools) {
+        const ranges = manifest.category_ranges;
+        const [minSigns, maxSigns] = ranges['Road Signs & Signals'];
+        const [minLaws, maxLaws] = ranges['Traffic Laws'];
+        const [minSafe, maxSafe] = ranges['Safe Driving Practices'];
+
+        let nSigns, nLaws, nSafe;
+        while (true) {
+            nSigns = randint(minSigns, maxSigns);
+            nLaws = randint(minLaws, maxLaws);
+            nSafe = manifest.exam_length - nSigns - nLaws;
+            if (minSafe <= nSafe && nSafe <= maxSafe) break;
+        }
+
+        return shuffle([
+            ...sample(pools['Road Signs & Signals'], nSigns),
+            ...sample(pools['Traffic Laws'], nLaws),
+            ...sample(pools['Safe Driving Practices'], nSafe),
+        ]);
+    }
+
+    function maxWrongAnswers(total, passRate) {
+        return total - Math.floor(total * passRate);
+    }
+
+    function loadState() {
+        const raw = sessionStorage.getItem(STATE_KEY);
+        return raw ? JSON.parse(raw) : null;
+    }
+
+    function saveState(state) {
+        sessionStorage.setItem(STATE_KEY, JSON.stringify(state));
+    }
+
+    async function fetchJSON(name) {
+        const response = await fetch(new URL(name, DATA_URL));
+        if (!response.ok) throw new Error(`Failed to load ${name}`);
+        return response.json();
+    }
+
+    async function startExam() {
+        const manifest = await fetchJSON('manifest.json');
+        const categories = Object.keys(manifest.categories);
+        const shards = await Promise.all(categories.map(c => fetchJSON(manifest.categories[c])));
+        const pools = {};
+        categories.forEach((c, i) => { pools[c] = shards[i]; });
+
+        saveState({
+            questions: generateExam(manifest, pools),
+            pass_rate: manifest.pass_rate,
+            current_index: 0,
+            score: 0,
+            incorrect_answers: [],
+        });
+    }
+
+    function submitAnswer(state, selected) {
+        const current = state.questions[state.current_index];
+        if (selected === current.correct_answer) {
+            state.score += 1;
+        } else {
+            state.incorrect_answers.push({ id: current.id, user_answer: selected });
+        }
+
+        // Early failure, same rule as main.submit_answer
+        const maxWrong = maxWrongAnswers(state.questions.length, state.pass_rate);
+        if (state.incorrect_answers.length > maxWrong) {
+            saveState(state);
+            location.href = 'results.html';
+            return;
+        }
+
+        state.current_index += 1;
+        saveState(state);
+        location.href = state.current_index >= state.questions.length ? 'results.html' : 'quiz.html';
+    }
+
+    function renderQuiz(state) {
+        const idx = state.current_index;
+        const total = state.questions.length;
+        const question = state.questions[idx];
+
+        const header = document.querySelectorAll('.quiz-header span');
+        header[0].textContent = `Question ${idx + 1} / ${total}`;
+        header[1].textContent = question.category;
+        document.querySelector('.progress-bar').style.width = `${((idx + 1) / total) * 100}%`;
+
+        const questionText = document.querySelector('.question-text');
+        questionText.textContent = question.question;
+        if (question.image) {
+            const img = document.createElement('img');
+            img.src = `static/images/${question.image}`;
+            img.alt = 'Question Image';
+            img.className = 'question-image';
+            questionText.after(img);
+        }
+
+        const form = document.getElementById('quiz-form');
+        form.setAttribute('data-correct-answer', question.correct_answer);
+
+        // Rebuild the options before quiz.html's own script binds its listeners
+        const grid = form.querySelector('.options-grid');
+        grid.replaceChildren(...question.options.map((option, i) => {
+            const label = document.createElement('label');
+            label.className = 'option-btn';
+            label.id = `option-${i + 1}`;
+            const input = document.createElement('input');
+            input.type = 'radio';
+            input.name = 'option';
+            input.value = option;
+            label.append(input, ' ' + option);
+            return label;
+        }));
+
+        document.getElementById('next-btn').textContent = idx + 1 === total ? 'Finish Exam' : 'Next Question';
+
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            const selected = form.querySelector('input[name="option"]:checked');
+            if (selected) submitAnswer(state, selected.value);
+        });
+    }
+
+    function renderResults(state) {
+        const total = state.questions.length;
+        const passed = state.score >= total * state.pass_rate;
+        const byId = new Map(state.questions.map(q => [q.id, q]));
+
+        const scoreDisplay = document.querySelector('.score-display');
+        scoreDisplay.textContent = `${state.score} / ${total}`;
+        scoreDisplay.classList.remove('passed', 'failed');
+        scoreDisplay.classList.add(passed ? 'passed' : 'failed');
+        document.querySelector('.results-card h2').textContent = passed ? 'PASSED' : 'FAILED';
+
+        if (!state.incorrect_answers.length) return;
+
+        const review = document.querySelector('.review-section');
+        const heading = document.createElement('h3');
+        heading.textContent = 'Review Incorrect Answers';
+        review.replaceChildren(heading);
+        for (const item of state.incorrect_answers) {
+            const q = byId.get(item.id);
+            if (!q) continue;
+            const card = document.createElement('div');
+            card.className = 'review-item';
+            const rows = [
+                ['review-q', `Q: ${q.question}`],
+                ['review-answer wrong-ans', `Your Answer: ${item.user_answer}`],
+                ['review-answer correct-ans', `Correct Answer: ${q.correct_answer}`],
+                ['review-answer', `Explanation: ${q.explanation}`],
+            ];
+            for (const [className, text] of rows) {
+                const row = document.createElement('div');
+                row.className = className;
+                row.textContent = text;
+                card.append(row);
+            }
+            card.lastChild.style.fontStyle = 'italic';
+            review.append(card);
+        }
+    }
+
+    const page = location.pathname.split('/').pop() || 'index.html';
+    const params = new URLSearchParams(location.search);
+
+    if (page === 'quiz.html' && params.has('new')) {
+        // Equivalent of /start: build the exam, then reload the quiz page with it
+        document.documentElement.style.visibility = 'hidden';
+        startExam()
+            .then(() => location.replace('quiz.html'))
+            .catch(err => {
+                document.documentElement.style.visibility = '';
+                alert(`Failed to start exam: ${err.message}`);
+                location.replace('index.html');
+            });
+        return;
+    }
+
+    // Registered from <head>, so this runs before the inline scripts in the templates
+    document.addEventListener('DOMContentLoaded', function () {
+        const state = loadState();
+        if (page === 'quiz.html') {
+            if (!state) return location.replace('index.html');
+            if (state.current_index >= state.questions.length) return location.replace('results.html');
+            renderQuiz(state);
+        } else if (page === 'results.html') {
+            if (!state) return location.replace('index.html');
+            renderResults(state);
+        }
+    });
+})();
@@ -0,0 +1,151 @@
+"""
+Spaced-repetition study deck (SM-2).
+
+Every card is a question the user missed. Each review grades the card:
+right pushes it out by a growing interval (1 day, 6 days, then the previous
+interval times the card's ease), wrong lowers the ease and brings it back
+the same day, behind the other cards due today, until it is answered right.
+
+Cards sit in a heap ordered by (due day, queue position), so the next card
+is the top of the heap and today's queue is whatever is due <= today: it
+grows as missed questions are added and shrinks as cards are reviewed, and
+nothing ever rescans the deck. Reviewing a card pushes a new heap entry; the
+old one is skipped when it surfaces (lazy deletion).
+
+A deck packs to 10 bytes per card for the user store (web) or a file
+(desktop).
+"""
+import datetime
+import heapq
+import os
+import struct
+
+# Day numbers count from here so they fit in 16 bits (until 2199)
+EPOCH = datetime.date(2020, 1, 1).toordinal()
+EASE_START = 2.5
+EASE_MIN = 1.3
+
+# question_id, due day, interval (days), ease * 20, repetitions
+_CARD = struct.Struct("<IHHBB")
+_FORMAT_VERSION = 1
+
+def today():
+    return datetime.date.today().toordinal() - EPOCH
+
+class Card:
+    __slots__ = ("question_id", "due", "interval", "ease", "reps", "seq")
+
+    def __init__(self, question_id, due, interval=0, ease=EASE_START, reps=0):
+        self.question_id = question_id
+        self.due = due
+        self.interval = interval
+        self.ease = ease
+        self.reps = reps
+        self.seq = 0   # queue position of the card's live heap entry
+
+class Deck:
+    def __init__(self, cards=()):
+        self.cards = {}
+        self._seq = 0
+        self._heap = []
+        for card in cards:
+            self.cards[card.question_id] = card
+            self._seq += 1
+            card.seq = self._seq
+            self._heap.append((card.due, card.seq, card.question_id))
+        heapq.heapify(self._heap)
+
+    def _push(self, card):
+        self._seq += 1
+        card.seq = self._seq
+        heapq.heappush(self._heap, (card.due, card.seq, card.question_id))
+        if len(self._heap) > 2 * len(self.cards) + 16:
+            # Mostly stale entries: rebuild from the live ones
+            self._heap = [(c.due, c.seq, c.question_id) for c in self.cards.values()]
+            heapq.heapify(self._heap)
+
+    def _top(self):
+        # Drops entries left behind by earlier reviews of the same card
+        while self._heap and self.cards[self._heap[0][2]].seq != self._heap[0][1]:
+            heapq.heappop(self._heap)
+        return self._heap[0] if self._heap else None
+
+    def add(self, question_ids, day=None):
+        """Adds missed questions as new cards due today. A card already in the deck is due again today."""
+        day = today() if day is None else day
+        for qid in question_ids:
+            card = self.cards.get(qid)
+            if card is None:
+                card = self.cards[qid] = Card(qid, day)
+            elif card.due > day:
+                # Missed again in an exam: relearn it
+                card.due, card.interval, card.reps = day, 0, 0
+                card.ease = max(EASE_MIN, card.ease - 0.2)
+            else:
+                continue
+            self._push(card)
+
+    def next_card(self, day=None):
+        """ID of the next question due on `day` (today by default), or None if nothing is due."""
+        day = today() if day is None else day
+        top = self._top()
+        return top[2] if top and top[0] <= day else None
+
+    def due_count(self, day=None):
+        """Cards due on or before `day`."""
+        day = today() if day is None else day
+        return sum(card.due <= day for card in self.cards.values())
+
+    def review(self, question_id, correct, day=None):
+        """Grades a review (SM-2 with quality 4 for right, 1 for wrong) and reschedules the card."""
+        day = today() if day is None else day
+        card = self.cards[question_id]
+        if correct:
+            card.reps += 1
+            if card.reps == 1:
+                card.interval = 1
+            elif card.reps == 2:
+                card.interval = 6
+            else:
+                card.interval = round(card.interval * card.ease)
+            card.interval = min(card.interval, 0xFFFF - day)
+            card.due = day + card.interval
+        else:
+            card.reps = 0
+            card.interval = 0
+            card.ease = max(EASE_MIN, card.ease - 0.54)   # SM-2's change for quality 1
+            card.due = day
+        card.reps = min(card.reps, 255)
+        self._push(card)
+
+    def pack(self):
+        parts = [bytes([_FORMAT_VERSION])]
+        # In queue order, so unpacking keeps the order of cards due the same day
+        for card in sorted(self.cards.values(), key=lambda c: (c.due, c.seq)):
+            parts.append(_CARD.pack(card.question_id, card.due, card.interval, round(card.ease * 20), card.reps))
+        return b"".join(parts)
+
+    @classmethod
+    def unpack(cls, data):
+        if not data or data[0] != _FORMAT_VERSION:
+            return cls()
+        return cls(
+            Card(qid, due, interval, ease / 20, reps)
+            for qid, due, interval, ease, reps in _CARD.iter_unpack(data[1:])
+        )
+
+    def __len__(self):
+        return len(self.cards)
+
+def load_file(path):
+    """Deck saved by save_file, or an empty one."""
+    if not os.path.exists(path):
+        return Deck()
+    with open(path, "rb") as f:
+        return Deck.unpack(f.read())
+
+def save_file(deck, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(deck.pack())
+    os.replace(tmp, path)
@@ -0,0 +1,82 @@
+"""
+Opt-in Server-Timing headers (SERVER_TIMING=1).
+
+Code marks named phases with
+
+    with timing.phase("render"):
+        ...
+
+and ServerTimingMiddleware reports them on the response, e.g.
+
+    Server-Timing: session-decode;dur=0.08, lookup;dur=0.02, render;dur=1.41, total;dur=1.9
+
+which browser devtools show under Network > Timing. When the middleware is not
+installed, phase() is a thread-local lookup returning a shared no-op object.
+"""
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+_current = threading.local()
+
+class _NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_PHASE = _NullPhase()
+
+class _Phase:
+    __slots__ = ("phases", "name", "started")
+
+    def __init__(self, phases, name):
+        self.phases = phases
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        self.phases[self.name] = self.phases.get(self.name, 0.0) + elapsed
+        return False
+
+def phase(name):
+    """Times a block as `name` if the current request is being timed."""
+    phases = getattr(_current, "phases", None)
+    if phases is None:
+        return _NULL_PHASE
+    return _Phase(phases, name)
+
+def format_header(phases, total):
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in phases.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+class ServerTimingMiddleware:
+    """
+    WSGI middleware adding the Server-Timing header. It wraps the whole Flask
+    app, so phases recorded while the session cookie is signed still make it in.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        phases = _current.phases = {}
+        started = time.perf_counter()
+
+        def timed_start_response(status, headers, exc_info=None):
+            headers = list(headers)
+            headers.append(("Server-Timing", format_header(phases, time.perf_counter() - started)))
+            return start_response(status, headers, exc_info)
+
+        try:
+            return self.wsgi_app(environ, timed_start_response)
+        finally:
+            _current.phases = None
@@ -0,0 +1,161 @@
+"""
+Small per-user state that has to outlive an exam: the study deck, the
+answer history behind weak-area exams, the questions already seen, and
+anything else keyed by the user ID kept in the session cookie (the exam
+state itself is wiped by /start).
+
+One SQLite file shared by every gunicorn worker (WAL mode, so readers don't
+block the writer). Values are opaque bytes under a (user, key) pair; callers
+pack them as compactly as they like.
+
+Rows not written for USER_STORE_TTL_DAYS are swept out (by whichever
+worker writes first after SWEEP_INTERVAL), so users who stop coming don't
+stay forever.
+
+Set USER_STORE_PATH to an empty string to turn the store off: reads return
+nothing and writes are dropped.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+STORE_PATH = os.environ.get("USER_STORE_PATH", "user_store.sqlite3")
+TTL = float(os.environ.get("USER_STORE_TTL_DAYS", "180")) * 86400
+SWEEP_INTERVAL = 3600.0
+# Rows deleted per sweep, so a sweep never holds the write lock for long; a full batch sweeps again on the next write
+SWEEP_BATCH = 1000
+
+_local = threading.local()
+_next_sweep = 0.0
+
+def enabled():
+    return bool(STORE_PATH)
+
+def _connection():
+    # One connection per thread, and a fresh one after a fork
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.pid == os.getpid():
+        return conn
+    directory = os.path.dirname(STORE_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(STORE_PATH, timeout=5, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS user_state ("
+        " user_id TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, updated REAL NOT NULL,"
+        " PRIMARY KEY (user_id, key)) WITHOUT ROWID"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS user_state_updated ON user_state (updated)")
+    _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+def get(user_id, key):
+    """The stored bytes, or None."""
+    if not enabled() or not user_id:
+        return None
+    try:
+        row = _connection().execute(
+            "SELECT value FROM user_state WHERE user_id = ? AND key = ?", (user_id, key)
+        ).fetchone()
+    except sqlite3.Error as e:
+        log.warning("User store read failed: %s", e)
+        return None
+    return row[0] if row else None
+
+def put(user_id, key, value):
+    """Stores `value` (bytes). Returns False if the store is off or the write failed."""
+    return put_many(user_id, {key: value})
+
+_UPSERT = (
+    "INSERT INTO user_state (user_id, key, value, updated) VALUES (?, ?, ?, ?)"
+    " ON CONFLICT (user_id, key) DO UPDATE SET value = excluded.value, updated = excluded.updated"
+)
+
+def put_many(user_id, values):
+    """Stores several {key: bytes} in one transaction. Returns False if the store is off or the write failed."""
+    return update(user_id, (), lambda stored: values)
+
+def update(user_id, keys, change):
+    """
+    Read-modify-write in one transaction: calls `change` with {key: stored
+    bytes} for `keys` and stores the {key: bytes} it returns. The write lock
+    is held from the read on, so concurrent updates for the same user (two
+    tabs, the next-exam thread) can't overwrite each other. Keep `change`
+    quick. Returns False if the store is off or the write failed.
+    """
+    if not enabled() or not user_id:
+        return False
+    now = time.time()
+    try:
+        conn = _connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stored = {}
+            if keys:
+                stored = dict(conn.execute(
+                    f"SELECT key, value FROM user_state WHERE user_id = ? AND key IN ({', '.join('?' * len(keys))})",
+                    (user_id, *keys),
+                ).fetchall())
+            values = change(stored)
+            conn.executemany(_UPSERT, [(user_id, key, sqlite3.Binary(value), now) for key, value in values.items()])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+    except sqlite3.Error as e:
+        log.warning("User store write failed: %s", e)
+        return False
+    _maybe_sweep(conn, now)
+    return True
+
+def claim(user_id, key, value):
+    """
+    Stores `value` only if nothing is stored under `key` yet, atomically.
+    True if this call stored it (or the store is off, so there's nobody to race).
+    """
+    if not enabled() or not user_id:
+        return True
+    try:
+        return _connection().execute(
+            "INSERT OR IGNORE INTO user_state (user_id, key, value, updated) VALUES (?, ?, ?, ?)",
+            (user_id, key, sqlite3.Binary(value), time.time()),
+        ).rowcount == 1
+    except sqlite3.Error as e:
+        log.warning("User store write failed: %s", e)
+        return True
+
+def delete(user_id, key):
+    """Returns False if the store is off or the delete failed."""
+    if not enabled() or not user_id:
+        return False
+    try:
+        _connection().execute("DELETE FROM user_state WHERE user_id = ? AND key = ?", (user_id, key))
+    except sqlite3.Error as e:
+        log.warning("User store delete failed: %s", e)
+        return False
+    return True
+
+def _maybe_sweep(conn, now):
+    global _next_sweep
+    if now < _next_sweep or not TTL:
+        return
+    _next_sweep = now + SWEEP_INTERVAL
+    try:
+        removed = conn.execute(
+            "DELETE FROM user_state WHERE (user_id, key) IN"
+            " (SELECT user_id, key FROM user_state WHERE updated < ? LIMIT ?)",
+            (now - TTL, SWEEP_BATCH),
+        ).rowcount
+    except sqlite3.Error as e:
+        log.warning("User store sweep failed: %s", e)
+        return
+    if removed >= SWEEP_BATCH:
+        _next_sweep = now
+    if removed:
+        log.info("Swept %d stale user store rows", removed)
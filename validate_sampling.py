@@ -0,0 +1,264 @@
+"""
+Statistical checks that exam sampling is fair.
+
+Two sources of exams are checked:
+  - exam_logic.generate_exam itself (the code that actually runs), and
+  - a vectorized NumPy version of the same sampler, built from the same
+    blueprint constants, which can produce millions of exams in seconds.
+
+For each source it tallies per-question exposure, the histogram of category
+counts, pairwise co-occurrence and (for generate_exam) which category shows
+up at each position, then runs chi-square tests against what uniform
+sampling predicts:
+
+  category_counts   every valid (signs, laws, safe) split equally likely,
+                    and never a split outside CATEGORY_RANGES
+  exposure[<cat>]   every question in a category picked equally often
+  cooccurrence      every pair of questions (per pair of categories) shown
+                    together equally often
+  positions         shuffling leaves no category bias by position
+
+Exits with status 1 if any test fails at --alpha, so it can gate a change
+to the sampler.
+
+Usage:
+    uv run validate_sampling.py
+    uv run validate_sampling.py --exams 5000000 --python-exams 200000
+    uv run validate_sampling.py --pool question_pool/synthetic_100000.json
+"""
+import argparse
+import math
+import random
+import sys
+import time
+
+import numpy as np
+
+import exam_logic
+
+BATCH_SIZE = 100_000
+# Co-occurrence is a questions x questions matrix, skip it for huge pools
+COOCCURRENCE_MAX_QUESTIONS = 2_000
+# Categories bigger than this are sampled by drawing with replacement and
+# redrawing the rows that repeat, instead of shuffling the whole category
+DENSE_SAMPLING_MAX = 4_096
+
+def chi2_sf(stat, df):
+    """P(X >= stat) for X ~ chi-square(df), via the Wilson-Hilferty approximation."""
+    if df <= 0:
+        return 1.0
+    z = ((stat / df) ** (1 / 3) - (1 - 2 / (9 * df))) / math.sqrt(2 / (9 * df))
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def chi_square(observed, expected, constraints=1, trials=None):
+    """
+    Goodness of fit. `constraints` is how many totals were fixed from the data.
+
+    Pass `trials` when each cell counts exams that include something (a
+    question, a pair) rather than splitting exams between cells: a cell's
+    variance is then binomial, expected * (1 - expected / trials).
+    """
+    observed = np.asarray(observed, dtype=np.float64).ravel()
+    expected = np.asarray(expected, dtype=np.float64).ravel()
+    variance = expected * (1 - expected / trials) if trials else expected
+    stat = float(((observed - expected) ** 2 / variance).sum())
+    df = observed.size - constraints
+    max_dev = float(np.abs(observed / expected - 1).max())
+    return stat, df, chi2_sf(stat, df), max_dev
+
+class Pool:
+    """Question indices grouped by category, in CATEGORY_RANGES order."""
+
+    def __init__(self, questions):
+        self.categories = list(exam_logic.CATEGORY_RANGES)
+        self.size = len(questions)
+        self.index_of = {q["id"]: i for i, q in enumerate(questions)}
+        self.category_of = np.array([self.categories.index(q["category"]) for q in questions], dtype=np.int8)
+        self.members = [np.flatnonzero(self.category_of == c) for c in range(len(self.categories))]
+        self.combos = [tuple(c[name] for name in self.categories) for c in exam_logic.valid_category_counts()]
+
+# --- Exam sources ---
+
+def _category_counts(n_exams, rng):
+    """The generate_exam retry loop, run for a whole batch at once."""
+    ranges = list(exam_logic.CATEGORY_RANGES.values())
+    low, high = ranges[-1]
+    out = np.empty((0, len(ranges)), dtype=np.int64)
+    while len(out) < n_exams:
+        drawn = np.stack([rng.integers(lo, hi + 1, size=n_exams) for lo, hi in ranges[:-1]], axis=1)
+        last = exam_logic.EXAM_LENGTH - drawn.sum(axis=1)
+        ok = (last >= low) & (last <= high)
+        out = np.concatenate([out, np.column_stack([drawn[ok], last[ok]])])
+    return out[:n_exams]
+
+def _sample_rows(n, counts, rng):
+    """Per row, `counts[row]` distinct indices from range(n), left-aligned. Returns (indices, mask)."""
+    width = int(counts.max())
+    if n <= DENSE_SAMPLING_MAX:
+        # The first `width` steps of a Fisher-Yates shuffle, on every row at once
+        rows = np.arange(len(counts))
+        perm = np.tile(np.arange(n, dtype=np.int32), (len(counts), 1))
+        for j in range(width):
+            swap = j + rng.integers(0, n - j, size=len(counts))
+            perm[rows, j], perm[rows, swap] = perm[rows, swap], perm[rows, j]
+        picks = perm[:, :width]
+    else:
+        picks = rng.integers(0, n, size=(len(counts), width))
+        while True:
+            ordered = np.sort(picks, axis=1)
+            repeats = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+            if not repeats.any():
+                break
+            picks[repeats] = rng.integers(0, n, size=(int(repeats.sum()), width))
+    mask = np.arange(width) < counts[:, None]
+    return picks, mask
+
+def vectorized_exams(pool, n_exams, seed=None, batch_size=BATCH_SIZE):
+    """Yields (category_counts, picks) batches; picks are question indices, one exam per row."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_exams, batch_size):
+        n = min(batch_size, n_exams - start)
+        counts = np.minimum(_category_counts(n, rng), [len(m) for m in pool.members])
+        columns = []
+        for members, column in zip(pool.members, counts.T):
+            local, mask = _sample_rows(len(members), column, rng)
+            # Every exam has EXAM_LENGTH questions, so gathering the masked
+            # picks row by row gives a rectangular array again
+            columns.append((members[local], mask))
+        picks = np.concatenate([p for p, _ in columns], axis=1)
+        mask = np.concatenate([m for _, m in columns], axis=1)
+        yield counts, picks[mask].reshape(n, -1)
+
+def python_exams(pool, questions, n_exams, seed=None, batch_size=BATCH_SIZE):
+    """Same batches as vectorized_exams, but from the real generate_exam."""
+    random.seed(seed)
+    for start in range(0, n_exams, batch_size):
+        n = min(batch_size, n_exams - start)
+        picks = np.array(
+            [[pool.index_of[q["id"]] for q in exam_logic.generate_exam(questions)] for _ in range(n)],
+            dtype=np.int64,
+        )
+        counts = np.stack([(pool.category_of[picks] == c).sum(axis=1) for c in range(len(pool.categories))], axis=1)
+        yield counts, picks
+
+# --- Statistics ---
+
+class SamplingStats:
+    def __init__(self, pool, cooccurrence=True, positions=False):
+        self.pool = pool
+        self.exams = 0
+        self.combo_counts = np.zeros(len(pool.combos), dtype=np.int64)
+        self.invalid_combos = 0
+        self.exposure = np.zeros(pool.size, dtype=np.int64)
+        self.cooccurrence = np.zeros((pool.size, pool.size)) if cooccurrence else None
+        self.positions = np.zeros((exam_logic.EXAM_LENGTH, len(pool.categories)), dtype=np.int64) if positions else None
+
+    def add(self, counts, picks):
+        self.exams += len(picks)
+
+        # Each split as one integer (digits in base EXAM_LENGTH + 1) so it can be counted in one pass
+        place = (exam_logic.EXAM_LENGTH + 1) ** np.arange(counts.shape[1])
+        frequency = np.bincount(counts @ place, minlength=int(place[-1] * (exam_logic.EXAM_LENGTH + 1)))
+        valid = np.array(self.pool.combos) @ place
+        self.combo_counts += frequency[valid]
+        self.invalid_combos += int(frequency.sum() - frequency[valid].sum())
+
+        self.exposure += np.bincount(picks.ravel(), minlength=self.pool.size)
+
+        if self.cooccurrence is not None:
+            onehot = np.zeros((len(picks), self.pool.size), dtype=np.float32)
+            np.put_along_axis(onehot, picks, 1, axis=1)
+            self.cooccurrence += onehot.T @ onehot
+
+        if self.positions is not None:
+            categories = self.pool.category_of[picks]
+            for c in range(len(self.pool.categories)):
+                self.positions[:, c] += (categories == c).sum(axis=0)
+
+    def tests(self):
+        """[(name, stat, df, p, max relative deviation)]"""
+        pool = self.pool
+        results = []
+
+        expected = np.full(len(pool.combos), self.exams / len(pool.combos))
+        results.append(("category_counts", *chi_square(self.combo_counts, expected)))
+
+        for name, members in zip(pool.categories, pool.members):
+            observed = self.exposure[members]
+            expected = np.full(len(members), observed.mean())
+            results.append((f"exposure[{name}]", *chi_square(observed, expected, trials=self.exams)))
+
+        if self.cooccurrence is not None:
+            # Within a block (a pair of categories), sampling is uniform if every
+            # pair of questions is equally likely to be shown together
+            observed, expected = [], []
+            for a, rows in enumerate(pool.members):
+                for b, cols in enumerate(pool.members[a:], start=a):
+                    block = self.cooccurrence[np.ix_(rows, cols)]
+                    cells = block[np.triu_indices(len(rows), k=1)] if a == b else block.ravel()
+                    observed.append(cells)
+                    expected.append(np.full(cells.size, cells.mean()))
+            results.append(("cooccurrence", *chi_square(
+                np.concatenate(observed), np.concatenate(expected), len(observed), trials=self.exams
+            )))
+
+        if self.positions is not None:
+            # Independence of position and category: expected = row total x column share
+            shares = self.positions.sum(axis=0) / self.positions.sum()
+            expected = self.positions.sum(axis=1, keepdims=True) * shares
+            constraints = self.positions.shape[0] + self.positions.shape[1] - 1
+            results.append(("positions", *chi_square(self.positions, expected, constraints)))
+
+        return results
+
+def report(label, stats, alpha, elapsed):
+    print(f"\n{label}: {stats.exams:,} exams in {elapsed:.1f}s")
+    print(f"  {'test':<38} {'chi2':>12} {'df':>7} {'p':>10} {'max dev':>9}")
+    failed = []
+    if stats.invalid_combos:
+        print(f"  {stats.invalid_combos} exams had category counts outside CATEGORY_RANGES  FAIL")
+        failed.append("category_ranges")
+    for name, stat, df, p, max_dev in stats.tests():
+        flag = "  FAIL" if p < alpha else ""
+        if flag:
+            failed.append(name)
+        print(f"  {name:<38} {stat:>12.1f} {df:>7} {p:>10.3g} {max_dev:>8.1%}{flag}")
+    return failed
+
+def run(questions, n_exams, n_python, alpha, seed):
+    pool = Pool(questions)
+    cooccurrence = pool.size <= COOCCURRENCE_MAX_QUESTIONS
+    failed = []
+
+    started = time.perf_counter()
+    stats = SamplingStats(pool, cooccurrence=cooccurrence)
+    for counts, picks in vectorized_exams(pool, n_exams, seed=seed):
+        stats.add(counts, picks)
+    failed += [f"vectorized {name}" for name in report("Vectorized sampler", stats, alpha, time.perf_counter() - started)]
+
+    if n_python:
+        started = time.perf_counter()
+        stats = SamplingStats(pool, cooccurrence=cooccurrence, positions=True)
+        for counts, picks in python_exams(pool, questions, n_python, seed=seed):
+            stats.add(counts, picks)
+        elapsed = time.perf_counter() - started
+        failed += [f"generate_exam {name}" for name in report("exam_logic.generate_exam", stats, alpha, elapsed)]
+
+    if not cooccurrence:
+        print(f"\n(co-occurrence skipped: more than {COOCCURRENCE_MAX_QUESTIONS} questions)")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that exam sampling is uniform and respects the blueprint.")
+    parser.add_argument("--pool", default="question_pool/questions.json", help="Question pool to sample from")
+    parser.add_argument("--exams", type=int, default=2_000_000, help="Exams from the vectorized sampler (default 2M)")
+    parser.add_argument("--python-exams", type=int, default=50_000, help="Exams from generate_exam itself (default 50k)")
+    parser.add_argument("--alpha", type=float, default=1e-6, help="Fail tests with p below this (default 1e-6)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed both samplers")
+    args = parser.parse_args()
+
+    failed = run(exam_logic.load_questions(args.pool), args.exams, args.python_exams, args.alpha, args.seed)
+    if failed:
+        print(f"\nFAILED: {', '.join(failed)}")
+        sys.exit(1)
+    print("\nAll sampling checks passed.")
@@ -0,0 +1,173 @@
+"""
+"Focus on my weak areas" exams: the official blueprint, but questions (and
+the category split) weighted toward what this user tends to get wrong.
+
+Every question the user has answered gets a weight from their smoothed miss
+rate on it, relative to an even chance:
+
+    weight = ((misses + 1) / (attempts + 2) / 0.5) ** WEAK_FOCUS
+
+so a question never seen weighs 1, one always missed up to 2^focus and one
+always answered right goes toward 0 (floored at MIN_WEIGHT, so it can
+still come up).
+
+Draws use one Fenwick tree per category, over the category's questions, with
+an implicit weight of 1 everywhere and the user's answered questions stored
+as sparse adjustments. Building it touches only the questions in the history,
+a draw or a weight change is O(log n), so an exam costs the same whatever
+the pool size.
+
+The category split is one of the splits generate_exam allows, picked with
+probability proportional to the product over categories of the category's
+mean weight to the power of its count, which is uniform for a new user.
+
+History is {question_id: (attempts, misses)}, packed to 8 bytes a question.
+"""
+import os
+import random
+import struct
+
+import exam_logic
+
+FOCUS = float(os.environ.get("WEAK_FOCUS", "2"))
+MIN_WEIGHT = 0.1
+
+# question_id, attempts, misses
+_ENTRY = struct.Struct("<IHH")
+
+class SparseFenwick:
+    """
+    Fenwick (binary indexed) tree over `size` slots that each start at
+    `base`, with only the changed nodes stored.
+    """
+
+    def __init__(self, size, base=1.0):
+        self.size = size
+        self.base = base
+        self._delta = {}
+        self._values = {}
+        self._top = 1 << max(size.bit_length() - 1, 0)
+
+    def get(self, i):
+        return self._values.get(i, self.base)
+
+    def set(self, i, value):
+        delta = value - self.get(i)
+        if not delta:
+            return
+        self._values[i] = value
+        i += 1
+        while i <= self.size:
+            self._delta[i] = self._delta.get(i, 0.0) + delta
+            i += i & -i
+
+    def total(self):
+        return self.prefix(self.size)
+
+    def prefix(self, n):
+        """Sum of the first n slots."""
+        total = n * self.base
+        while n > 0:
+            total += self._delta.get(n, 0.0)
+            n -= n & -n
+        return total
+
+    def find(self, u):
+        """Index of the slot where the running sum passes u (0 <= u < total)."""
+        pos = 0
+        step = self._top
+        while step:
+            node = pos + step
+            if node <= self.size:
+                # Node `node` covers slots (pos, node], whose base part is `step`
+                mass = step * self.base + self._delta.get(node, 0.0)
+                if mass <= u:
+                    u -= mass
+                    pos = node
+            step >>= 1
+        return min(pos, self.size - 1)
+
+def question_weight(attempts, misses):
+    return max(MIN_WEIGHT, ((misses + 1) / (attempts + 2) / 0.5) ** FOCUS)
+
+class WeakAreaSampler:
+    """Built once per pool; `generate_exam` then only touches the user's history."""
+
+    def __init__(self, questions):
+        self.questions = questions
+        self.categories = list(exam_logic.CATEGORY_RANGES)
+        self.members = {c: [] for c in self.categories}
+        self.slot_of = {}
+        for q in questions:
+            members = self.members.get(q["category"])
+            if members is not None:
+                self.slot_of[q["id"]] = (q["category"], len(members))
+                members.append(q)
+        self.splits = exam_logic.valid_category_counts()
+
+    def trees(self, history):
+        trees = {c: SparseFenwick(len(self.members[c])) for c in self.categories}
+        for qid, (attempts, misses) in history.items():
+            slot = self.slot_of.get(qid)
+            if slot:
+                trees[slot[0]].set(slot[1], question_weight(attempts, misses))
+        return trees
+
+    def generate_exam(self, history, rng=random, admit=None):
+        """
+        A 30-question exam within CATEGORY_RANGES, biased by `history`.
+        `admit` is an optional exposure-control lottery for each draw.
+        """
+        trees = self.trees(history)
+        mean = {c: trees[c].total() / len(self.members[c]) if self.members[c] else 0.0 for c in self.categories}
+        split_weights = []
+        for split in self.splits:
+            w = 1.0
+            for c, n in split.items():
+                w *= mean[c] ** n
+            split_weights.append(w)
+        split = rng.choices(self.splits, weights=split_weights)[0]
+
+        exam = []
+        for c, n in split.items():
+            tree = trees[c]
+            k = min(n, len(self.members[c]))
+            chosen, rejected = [], []
+            while len(chosen) < k and len(rejected) < 2 * k:
+                i = tree.find(rng.random() * tree.total())
+                if not tree.get(i):
+                    break   # only rounding error left: everything has been drawn
+                q = self.members[c][i]
+                (chosen if admit is None or admit(q["id"]) else rejected).append(q)
+                tree.set(i, 0.0)   # without replacement
+            exam.extend(chosen + rejected[:k - len(chosen)])
+        rng.shuffle(exam)
+        return exam
+
+def record(history, question_id, correct):
+    """Counts one answer into `history` (in place)."""
+    attempts, misses = history.get(question_id, (0, 0))
+    if attempts >= 0xFFFF:
+        # Halve both rather than overflow; keeps the rate
+        attempts, misses = attempts // 2, misses // 2
+    history[question_id] = (attempts + 1, misses + (not correct))
+
+def pack(history):
+    return b"".join(_ENTRY.pack(qid, attempts, misses) for qid, (attempts, misses) in history.items())
+
+def unpack(data):
+    if not data:
+        return {}
+    return {qid: (attempts, misses) for qid, attempts, misses in _ENTRY.iter_unpack(data)}
+
+def load_file(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return unpack(f.read())
+
+def save_file(history, path):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(pack(history))
+    os.replace(tmp, path)